@@ -30,7 +30,11 @@ bl_info = {
     "description": "Imports GTA SA IPL files with correct coordinates.",
 }
 
-from .gui import register, unregister
+import importlib.util
+
+# Процессы декодирования (decode.DecodePool) импортируют пакет в обычном Python без Blender
+if importlib.util.find_spec("bpy") is not None:
+    from .gui import register, unregister
 
 if "bpy" in locals():
     import importlib
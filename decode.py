@@ -0,0 +1,286 @@
+# MIT License
+#
+# Copyright (c) 2025 xtreme byte
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Декодирование DFF/TXD без bpy: выполняется в главном потоке или в процессах DecodePool
+
+import os
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .dff import dff, Texture
+from .txd import txd
+from .log import get_logger
+from .profiler import phase
+
+logger = get_logger("decode")
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Без Pillow PNG не записываются; импорт предупреждает об этом один раз при настройке текстур
+PNG_SUPPORTED = Image is not None
+
+# Компактный результат декодирования модели: только массивы и кортежи, которые дёшево передать между процессами
+ModelPayload = namedtuple("ModelPayload", "vertices triangles uv_arrays materials has_mat_split filtered")
+MaterialSpec = namedtuple("MaterialSpec", "tex_name color plugins")
+DecodedTexture = namedtuple("DecodedTexture", "name width height rgba")
+
+MATERIAL_PLUGINS = ('bump_map', 'env_map', 'dual', 'spec', 'refl', 'uv_anim')
+
+def extract_textures_from_txd(txd_data, output_dir, dds=False):
+    """Сохраняет текстуры TXD в PNG; при dds=True сжатые DXT1/3/5 записываются в .dds без декодирования."""
+    if not txd_data:
+        logger.debug("Нет данных TXD для обработки")
+        return {}
+
+    texture_dict = {}
+    txd_loader = txd()
+    try:
+        with phase('txd_decode'):
+            txd_loader.load_memory(txd_data)
+    except Exception as e:
+        logger.error(f"Ошибка загрузки TXD: {e}")
+        return {}
+
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+    except Exception as e:
+        logger.error(f"Ошибка создания директории {output_dir}: {e}")
+        return {}
+
+    for texture in txd_loader.native_textures:
+        try:
+            dds_data = texture.to_dds() if dds and hasattr(texture, 'to_dds') else None
+            if dds_data:
+                texture_path = os.path.join(output_dir, f"{texture.name}.dds")
+                with phase('png_write'), open(texture_path, 'wb') as dds_file:
+                    dds_file.write(dds_data)
+                texture_dict[texture.name.lower()] = texture_path
+                logger.debug("Сохранена текстура DDS: %s", texture_path)
+                continue
+            if not PNG_SUPPORTED:
+                continue
+
+            with phase('txd_decode'):
+                rgba_data = texture.to_rgba(level=0)
+            width = texture.get_width(0)
+            height = texture.get_height(0)
+
+            if rgba_data and width > 0 and height > 0:
+                texture_path = os.path.join(output_dir, f"{texture.name}.png")
+                with phase('png_write'):
+                    img = Image.frombytes("RGBA", (width, height), rgba_data)
+                    img.save(texture_path, "PNG")
+                texture_dict[texture.name.lower()] = texture_path
+                logger.debug("Сохранена текстура: %s", texture_path)
+            else:
+                logger.warning(f"Не удалось декодировать текстуру {texture.name}: нет данных или неверные размеры")
+        except Exception as e:
+            logger.error(f"Ошибка сохранения текстуры {texture.name}: {e}")
+            continue
+
+    return texture_dict
+
+def decode_txd_textures(txd_data):
+    """Декодирует текстуры TXD в список DecodedTexture с RGBA-буфером уровня 0."""
+    with phase('txd_decode'):
+        return _decode_txd_textures(txd_data)
+
+def _decode_txd_textures(txd_data):
+    if not txd_data:
+        logger.debug("Нет данных TXD для обработки")
+        return []
+
+    txd_loader = txd()
+    try:
+        txd_loader.load_memory(txd_data)
+    except Exception as e:
+        logger.error(f"Ошибка загрузки TXD: {e}")
+        return []
+
+    textures = []
+    for texture in txd_loader.native_textures:
+        try:
+            rgba_data = texture.to_rgba(level=0)
+            width = texture.get_width(0)
+            height = texture.get_height(0)
+
+            if not rgba_data or width <= 0 or height <= 0:
+                logger.warning(f"Не удалось декодировать текстуру {texture.name}: нет данных или неверные размеры")
+                continue
+            textures.append(DecodedTexture(texture.name, width, height, bytes(rgba_data)))
+        except Exception as e:
+            logger.error(f"Ошибка декодирования текстуры {texture.name}: {e}")
+            continue
+
+    return textures
+
+def decode_txd_job(mode, txd_data, output_dir):
+    """Обработка TXD для режима текстур: 'memory' — RGBA-буферы, 'dds'/'png' — файлы в output_dir."""
+    if mode == 'memory':
+        return decode_txd_textures(txd_data)
+    return extract_textures_from_txd(txd_data, output_dir, dds=(mode == 'dds'))
+
+def filter_triangles(vertices, triangles):
+    """Фильтрует дегенеративные треугольники.
+
+    vertices — массив (V, 3), triangles — массив (N, 4) в порядке полей Triangle: b, a, material, c.
+    Возвращает маску оставленных треугольников, число треугольников с неверными индексами и число дегенеративных.
+    """
+    # Без вершин индексы любого треугольника неверны, а индексировать пустой массив нельзя
+    if len(vertices) == 0:
+        return np.zeros(len(triangles), dtype=bool), len(triangles), 0
+
+    corners = triangles[:, [1, 0, 3]]
+    in_range = (corners < len(vertices)).all(axis=1)
+
+    # Выбывшие по индексам треугольники проверяются на нулевой вершине, чтобы не выйти за границы
+    safe_corners = np.where(in_range[:, None], corners, 0)
+    v0, v1, v2 = (vertices[safe_corners[:, i]] for i in range(3))
+    degenerate = (np.isclose(v0, v1).all(axis=1) |
+                  np.isclose(v1, v2).all(axis=1) |
+                  np.isclose(v0, v2).all(axis=1))
+    degenerate &= in_range
+
+    keep = in_range & ~degenerate
+    return keep, int(len(triangles) - in_range.sum()), int(degenerate.sum())
+
+def _plugin_key(value):
+    """Приводит настройки плагина материала к хэшируемому виду; текстуры сравниваются по имени."""
+    if isinstance(value, Texture):
+        return ('texture', value.name.lower(), value.mask.lower())
+    if isinstance(value, (list, tuple)):
+        return tuple(_plugin_key(item) for item in value)
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+def material_spec(mat):
+    """Описание материала DFF, достаточное для создания материала Blender и ключа кэша материалов."""
+    tex_name = mat.textures[0].name.lower() if mat.textures else None
+    color = tuple(mat.color) if mat.color else None
+    plugins = tuple(
+        (name, _plugin_key(mat.plugins[name]))
+        for name in MATERIAL_PLUGINS
+        if name in mat.plugins
+    )
+    return MaterialSpec(tex_name, color, plugins)
+
+def decode_dff(model_name, dff_source):
+    """Загружает DFF из папки или памяти и готовит отфильтрованную геометрию в виде ModelPayload."""
+    with phase('dff_parse'):
+        return _decode_dff(model_name, dff_source)
+
+def _decode_dff(model_name, dff_source):
+    dff_loader = dff()
+
+    try:
+        if isinstance(dff_source, str):
+            dff_path = os.path.join(dff_source, model_name + '.dff')
+            if not os.path.exists(dff_path):
+                logger.error(f"Ошибка: Файл {dff_path} не найден")
+                return None
+            logger.debug(f"Загрузка DFF из файла: {dff_path}")
+            dff_loader.load_file(dff_path)
+        else:
+            if dff_source is None:
+                logger.error(f"Ошибка: Данные для модели {model_name} не предоставлены")
+                return None
+            logger.debug(f"Загрузка DFF из памяти для модели: {model_name}")
+            dff_loader.load_memory(dff_source)
+    except Exception as e:
+        logger.error(f"Ошибка при загрузке DFF для {model_name}: {e}")
+        return None
+
+    if not dff_loader.geometry_list:
+        logger.error(f"Ошибка: Не удалось загрузить геометрию для {model_name}")
+        return None
+
+    geometry = dff_loader.geometry_list[0]
+    logger.debug(f"Геометрия загружена: {len(geometry.vertex_array)} вершин, {len(geometry.triangle_array)} треугольников")
+
+    has_mat_split = 'mat_split' in geometry.extensions
+    if has_mat_split:
+        triangle_array = np.array(geometry.extensions['mat_split'], dtype=np.int64).reshape(-1, 4)
+    else:
+        triangle_array = geometry.triangle_array.astype(np.int64)
+
+    vertex_array = geometry.vertex_array
+    keep, invalid_count, degenerate_count = filter_triangles(vertex_array, triangle_array)
+    logger.debug("Отфильтровано треугольников: %d -> %d (неверные индексы: %d, дегенеративные: %d)",
+                 len(triangle_array), len(triangle_array) - invalid_count - degenerate_count,
+                 invalid_count, degenerate_count)
+    triangle_array = triangle_array[keep]
+
+    return ModelPayload(
+        vertex_array,
+        triangle_array,
+        list(geometry.uv_arrays),
+        [material_spec(mat) for mat in geometry.materials],
+        has_mat_split,
+        invalid_count + degenerate_count
+    )
+
+class DecodePool:
+    """Пул процессов, декодирующих DFF/TXD параллельно; объекты Blender создаются только в главном потоке."""
+
+    def __init__(self, workers=0):
+        self.workers = workers or os.cpu_count() or 1
+        # Сколько моделей держать в работе: каждая ждёт в очереди пула копией своих данных
+        self.window = 2 * self.workers
+        self.futures = set()
+        # spawn одинаково работает на всех ОС и не копирует состояние Blender в дочерние процессы
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit_model(self, model_name, dff_source):
+        # memoryview на mmap не передаётся между процессами, поэтому данные копируются
+        if dff_source is not None and not isinstance(dff_source, str):
+            dff_source = bytes(dff_source)
+        return self._track(self.executor.submit(decode_dff, model_name, dff_source))
+
+    def submit_textures(self, decode, txd_data, output_dir):
+        return self._track(self.executor.submit(decode, bytes(txd_data), output_dir))
+
+    def _track(self, future):
+        self.futures.add(future)
+        future.add_done_callback(self.futures.discard)
+        return future
+
+    def close(self):
+        # shutdown(cancel_futures=True) появился только в Python 3.9, а Blender 2.80 поставляется с 3.7
+        for future in list(self.futures):
+            future.cancel()
+        self.executor.shutdown(wait=True)
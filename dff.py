@@ -24,7 +24,12 @@ from collections import namedtuple
 from struct import unpack_from, calcsize, pack
 from enum import Enum, IntEnum
 
+import numpy as np
+
 from .pyffi.utils import tristrip
+from .log import get_logger
+
+logger = get_logger("dff")
 
 # Data types
 Chunk         = namedtuple("Chunk"         , "type size version")
@@ -272,6 +277,89 @@ class Sections:
     def set_library_id(version, build):
         Sections.library_id = Sections.get_library_id(version,build)
         
+#######################################################
+class TupleArray:
+
+    # A per-vertex (or per-triangle) geometry field stored as a NumPy array.
+    # Reading the attribute returns a list of namedtuples for code that
+    # expects the old representation; the list is built once on first
+    # access and from then on it is the source of truth, so appending to it
+    # keeps working. The array is reachable through the `array` view.
+
+    #######################################################
+    def __init__(self, tuple_type, dtype, width, layered=False):
+        self.tuple_type = tuple_type
+        self.dtype      = np.dtype(dtype)
+        self.width      = width
+        self.layered    = layered
+        self.array      = TupleArrayView(self)
+
+    #######################################################
+    def __set_name__(self, owner, name):
+        self.list_slot  = "_%s_list" % name
+        self.array_slot = "_%s_array" % name
+
+    #######################################################
+    def _to_list(self, array):
+        if self.layered:
+            return [list(map(self.tuple_type._make, layer.tolist())) for layer in array]
+        return list(map(self.tuple_type._make, array.tolist()))
+
+    #######################################################
+    def _to_array(self, items):
+        if self.layered:
+            return [np.array(layer, self.dtype).reshape(-1, self.width) for layer in items]
+        return np.array(items, self.dtype).reshape(-1, self.width)
+
+    #######################################################
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+
+        items = getattr(obj, self.list_slot)
+        if items is None:
+            items = self._to_list(getattr(obj, self.array_slot))
+            setattr(obj, self.list_slot, items)
+            setattr(obj, self.array_slot, None)
+
+        return items
+
+    #######################################################
+    def __set__(self, obj, items):
+        setattr(obj, self.list_slot, items)
+        setattr(obj, self.array_slot, None)
+
+    #######################################################
+    def get_array(self, obj):
+        array = getattr(obj, self.array_slot)
+        if array is not None:
+            return array
+
+        # Built from the list each time, since the list may have been modified
+        return self._to_array(getattr(obj, self.list_slot))
+
+    #######################################################
+    def set_array(self, obj, array):
+        setattr(obj, self.array_slot, array)
+        setattr(obj, self.list_slot, None)
+
+#######################################################
+class TupleArrayView:
+
+    #######################################################
+    def __init__(self, field):
+        self.field = field
+
+    #######################################################
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        return self.field.get_array(obj)
+
+    #######################################################
+    def __set__(self, obj, array):
+        self.field.set_array(obj, array)
+
 #######################################################
 class Texture:
 
@@ -981,7 +1069,7 @@ class SkinPLG:
                 self.bones_used.append(unpack_from("<B", data, pos)[0])
 
             pos = 4 + self._num_used_bones
-            vertices_count = len(geometry.vertices)
+            vertices_count = len(geometry.vertex_array)
 
             # Read vertex bone indices
             _data = unpack_from("<%dB" % (vertices_count * 4), data, pos)
@@ -1055,7 +1143,7 @@ class ExtraVertColorExtension:
         magic = unpack_from("<I", data, offset)[0]
         if magic != 0:
             colors = []
-            for i in range(len(geometry.vertices)):
+            for i in range(len(geometry.vertex_array)):
 
                 offset += 4
                 colors.append(
@@ -1248,7 +1336,8 @@ class PedAttractor2dfx:
 
         self.type = unpack_from("<I", data, offset)[0]
         self.rotation_matrix = Sections.read(Matrix, data, offset + 4)
-        self.external_script = data[offset + 40: strlen(data, offset + 40)]
+        external_script = unpack_from("<8s", data, offset + 40)[0]
+        self.external_script = external_script[:strlen(external_script)]
         self.ped_existing_probabiliy = unpack_from("<I", data, offset + 48)[0]
 
         self.external_script = self.external_script.decode('ascii')
@@ -1509,7 +1598,7 @@ class Extension2dfx:
                     entries_funcs[entry_type].from_mem(loc, data, pos, size)
                 )
             else:
-                print("Unimplemented Effect: %d" % (entry_type))
+                logger.warning("Unimplemented Effect: %d" % (entry_type))
 
             pos += size
 
@@ -1727,15 +1816,20 @@ class Geometry:
     __slots__ = [
         
         'flags',
-        'triangles',
-        'vertices',
+        '_triangles_list',
+        '_triangles_array',
+        '_vertices_list',
+        '_vertices_array',
         'surface_properties',
-        'prelit_colors',
-        'uv_layers',
+        '_prelit_colors_list',
+        '_prelit_colors_array',
+        '_uv_layers_list',
+        '_uv_layers_array',
         'bounding_sphere',
         'has_vertices',
         'has_normals',
-        'normals',
+        '_normals_list',
+        '_normals_array',
         'materials',
         'split_headers',
         'extensions',
@@ -1746,6 +1840,20 @@ class Geometry:
         '_vertex_bone_weights',
         '_hasMatFX'
     ]
+
+    # Vertex data is kept as NumPy arrays (vertex_array, normal_array, ...),
+    # the tuple lists below are materialized from them on demand
+    vertices      = TupleArray(Vector, "<f4", 3)
+    normals       = TupleArray(Vector, "<f4", 3)
+    prelit_colors = TupleArray(RGBA, "<u1", 4)
+    uv_layers     = TupleArray(TexCoords, "<f4", 2, layered=True)
+    triangles     = TupleArray(Triangle, "<u2", 4)
+
+    vertex_array   = vertices.array
+    normal_array   = normals.array
+    prelit_array   = prelit_colors.array
+    uv_arrays      = uv_layers.array
+    triangle_array = triangles.array # columns: b, a, material, c
     
     ##################################################################
     def __init__(self):
@@ -1784,18 +1892,13 @@ class Geometry:
     @staticmethod
     def from_mem(data, parent_chunk):
 
-        # Note: In the following function, I have used a loop
-        #      to load the texture coordinates or prelit colors,
-        #      although I feel that it might be more efficient to
-        #      convert an array to an array of namedtuples.
-        #      I have not found a way yet to implement such a function.
-
         self = Geometry()
         
         self.flags    = unpack_from("<I", data)[0]
         self._num_triangles = unpack_from("<I", data,4)[0]
         self._num_vertices  = unpack_from("<I", data,8)[0]
         rw_version    = Sections.get_rw_version(parent_chunk.version)
+        num_vertices  = self._num_vertices
         
         # read surface properties (only on rw below 0x34000)
         pos = 16
@@ -1807,13 +1910,10 @@ class Geometry:
 
             # Read prelighting colors
             if self.flags & rpGEOMETRYPRELIT:
-                self.prelit_colors = []
-                
-                for i in range(self._num_vertices):
-                    prelit_color = Sections.read(RGBA, data, pos)
-                    self.prelit_colors.append(prelit_color)
-
-                    pos += 4
+                self.prelit_array = np.frombuffer(
+                    data, "<u1", num_vertices * 4, pos
+                ).reshape(-1, 4)
+                pos += num_vertices * 4
 
             # Read Texture Mapping coordinates
             if self.flags & (rpGEOMETRYTEXTURED | rpGEOMETRYTEXTURED2):
@@ -1822,23 +1922,19 @@ class Geometry:
                     texCount = 2 if (self.flags & rpGEOMETRYTEXTURED2) else \
                         1 if (self.flags & rpGEOMETRYTEXTURED) else 0
 
-                self.uv_layers = []
+                uv_arrays = []
                 for i in range(texCount):
-
-                    self.uv_layers.append([]) #add empty new layer
-                    
-                    for j in range(self._num_vertices):
-                        
-                        tex_coord = Sections.read(TexCoords, data, pos)
-                        self.uv_layers[i].append(tex_coord)
-                        pos += 8
+                    uv_arrays.append(
+                        np.frombuffer(data, "<f4", num_vertices * 2, pos).reshape(-1, 2)
+                    )
+                    pos += num_vertices * 8
+                self.uv_arrays = uv_arrays
 
             # Read Triangles
-            for i in range(self._num_triangles):
-                triangle = Sections.read(Triangle, data, pos)
-                self.triangles.append(triangle)
-                
-                pos += 8
+            self.triangle_array = np.frombuffer(
+                data, "<u2", self._num_triangles * 4, pos
+            ).reshape(-1, 4)
+            pos += self._num_triangles * 8
 
         # Read  morph targets (This should be only once)
         self.bounding_sphere = Sections.read(Sphere, data, pos)
@@ -1850,17 +1946,17 @@ class Geometry:
 
         # read vertices
         if self.has_vertices:
-            for i in range(self._num_vertices):
-                vertice = Sections.read(Vector, data, pos)
-                self.vertices.append(vertice)
-                pos += 12
+            self.vertex_array = np.frombuffer(
+                data, "<f4", num_vertices * 3, pos
+            ).reshape(-1, 3)
+            pos += num_vertices * 12
             
         # read normals
         if self.has_normals:
-            for i in range(self._num_vertices):
-                normal = Sections.read(Vector, data, pos)
-                self.normals.append(normal)
-                pos += 12
+            self.normal_array = np.frombuffer(
+                data, "<f4", num_vertices * 3, pos
+            ).reshape(-1, 3)
+            pos += num_vertices * 12
 
         return self
 
@@ -2009,8 +2105,20 @@ class Geometry:
 #######################################################
 
 
-class dff:
+class ChunkReader:
+
+    # Cursor over a memoryview of the whole file, shared by the dff and txd
+    # readers. Sub-parsers receive zero-copy views (raw/view), so parsing a
+    # chunk never copies the rest of the buffer.
 
+    #######################################################
+    def set_data(self, data):
+        view = memoryview(data)
+        if view.format != 'B' or view.ndim != 1:
+            view = view.cast('B')
+
+        self.data = view
+        
     #######################################################
     def _read(self, size):
         current_pos = self.pos
@@ -2026,11 +2134,23 @@ class dff:
         
         return self.data[offset:offset+size]
 
+    #######################################################
+    def view(self, offset=None):
+
+        # Rest of the buffer from offset, without copying
+        if offset is None:
+            offset = self.pos
+
+        return self.data[offset:]
+
     #######################################################
     def read_chunk(self):
         chunk = Sections.read(Chunk, self.data, self._read(12))
         return chunk
 
+#######################################################
+class dff(ChunkReader):
+
     #######################################################
     def read_frame_list(self, parent_chunk):
 
@@ -2042,7 +2162,7 @@ class dff:
         frames_count = unpack_from("<I", self.data, self._read(4))[0]
 
         for i in range(frames_count):
-            frame = Frame.from_mem(self.data[self.pos:])
+            frame = Frame.from_mem(self.view())
             self.frame_list.append(frame)
             self._read(Frame.size())
 
@@ -2064,7 +2184,7 @@ class dff:
                 animation_data = None
 
                 if chunk.type == types["Frame"]:
-                    name = self.raw(strlen(self.data,self.pos)).decode("utf-8")
+                    name = bytes(self.raw(strlen(self.data,self.pos))).decode("utf-8")
                     
                 elif chunk.type == types["HAnim PLG"]:
                     bone_data = HAnimPLG.from_mem(self.raw(chunk.size))
@@ -2073,7 +2193,7 @@ class dff:
                     user_data = UserData.from_mem(self.raw(chunk.size))
 
                 elif chunk.type == types["Animation PLG"]:
-                    animation_data = AnimationPLG.from_mem(self.data[self.pos:])
+                    animation_data = AnimationPLG.from_mem(self.view())
 
                 self._read(chunk.size)
                 if name is not None:
@@ -2209,7 +2329,7 @@ class dff:
             from .native_psp import NativePSPGeometry
             NativePSPGeometry.unpack(geometry, self.raw(chunk_size))
         else:
-            print("Unsupported native platform %d" % (platform))
+            logger.warning("Unsupported native platform %d" % (platform))
 
         geometry.native_platform_type = platform
 
@@ -2333,24 +2453,24 @@ class dff:
 
         # Read a  texture
         texture = Texture.from_mem(
-            self.data[self.pos:self.pos+chunk.size]
+            self.raw(chunk.size)
         )
         
         self._read(chunk.size)
         
         # Texture Name
         chunk = self.read_chunk()
-        texture.name = self.raw(
+        texture.name = bytes(self.raw(
             strlen(self.data,self.pos)
-        ).decode("utf-8")
+        )).decode("utf-8")
         
         self._read(chunk.size)
         
         # Mask Name
         chunk = self.read_chunk()  
-        texture.mask = self.raw(
+        texture.mask = bytes(self.raw(
             strlen(self.data,self.pos)
-        ).decode("utf-8")
+        )).decode("utf-8")
         
         self._read(chunk.size)
         return texture
@@ -2387,7 +2507,7 @@ class dff:
                     # Read header
                     if chunk.type == types["Struct"]:
                         material = Material.from_mem(
-                            self.data[self.pos:self.pos+chunk.size]
+                            self.raw(chunk.size)
                         )
                         self.pos += chunk.size
 
@@ -2435,7 +2555,7 @@ class dff:
                                     if chunk.type == types["User Data PLG"]:
                                         material.add_plugin (
                                             "udata",
-                                            UserData.from_mem(self.data[self.pos:]))
+                                            UserData.from_mem(self.view()))
                                         
                                     if chunk.type == types["UV Animation PLG"]:
 
@@ -2448,13 +2568,13 @@ class dff:
                                         # Read n animations
                                         for i in range(anim_count[0]):
                                             material.add_plugin('uv_anim',
-                                                                self.raw(
+                                                                bytes(self.raw(
                                                                     strlen(
                                                                         self.data,
                                                                         self.pos
                                                                     ),
                                                                     self._read(32)
-                                                                ).decode('ascii')
+                                                                )).decode('ascii')
                                             )
                                             
                                     self.pos = __chunk_end
@@ -2491,7 +2611,7 @@ class dff:
         chunk_end = self.pos + parent_chunk.size
 
         chunk = self.read_chunk()
-        geometry = Geometry.from_mem(self.data[self.pos:], parent_chunk)
+        geometry = Geometry.from_mem(self.view(), parent_chunk)
 
         self._read(chunk.size)
 
@@ -2508,14 +2628,14 @@ class dff:
                 pass
 
             elif chunk.type == types["Delta Morph PLG"]:
-                delta_morph = DeltaMorphPLG.from_mem(self.data[self.pos:])
+                delta_morph = DeltaMorphPLG.from_mem(self.view())
                 geometry.extensions["delta_morph"] = delta_morph
 
                 self._read(chunk.size)
 
             elif chunk.type == types["Skin PLG"]:
 
-                skin = SkinPLG.from_mem(self.data[self.pos:], geometry)
+                skin = SkinPLG.from_mem(self.view(), geometry)
                 geometry.extensions["skin"] = skin
 
                 self._read(chunk.size)
@@ -2529,7 +2649,7 @@ class dff:
 
             elif chunk.type == types["User Data PLG"]:
                 geometry.extensions['user_data'] = \
-                    UserData.from_mem(self.data[self.pos:])
+                    UserData.from_mem(self.view())
 
                 self._read(chunk.size)
 
@@ -2567,7 +2687,7 @@ class dff:
             # STRUCT
             if chunk.type == types["Struct"]:
                 atomic = Atomic.from_mem(
-                    self.data[self.pos:self.pos+chunk.size]
+                    self.raw(chunk.size)
                 )
                 self.pos += chunk.size
 
@@ -2594,7 +2714,7 @@ class dff:
                         frame = self.frame_list[atomic.frame]
                         geometry = self.geometry_list[atomic.geometry]
 
-                        skin = SkinPLG.from_mem(self.data[self.pos:], geometry, frame)
+                        skin = SkinPLG.from_mem(self.view(), geometry, frame)
                         geometry.extensions["skin"] = skin
 
                         bone_frames = self.frame_list[atomic.frame + 1:]
@@ -2651,7 +2771,7 @@ class dff:
 
                 elif chunk.type == types["Collision Model"]:
                     self.collisions.append(
-                        self.data[self.pos:self.pos + chunk.size]
+                        self.raw(chunk.size)
                     )
                     self.pos += chunk.size
                     
@@ -2676,7 +2796,7 @@ class dff:
 
             if chunk.type == types["Animation Anim"]:
                 self.uvanim_dict.append(
-                    UVAnim.from_mem(self.data[self.pos:])
+                    UVAnim.from_mem(self.view())
                 )
 
             self._read(chunk.size)
@@ -2684,8 +2804,8 @@ class dff:
     #######################################################
     def load_memory(self, data):
 
-        self.data = data
-        while self.pos < len(data) - 12:
+        self.set_data(data)
+        while self.pos < len(self.data) - 12:
             chunk = self.read_chunk()
 
             if chunk.type == types["Clump"]:
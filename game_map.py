@@ -0,0 +1,231 @@
+# MIT License
+#
+# Copyright (c) 2025 xtreme byte
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Карта игры по манифестам default.dat/gta.dat. Манифест читается сразу (он маленький), а IPL, IDE
+# и IMG-архивы разбираются только при загрузке региона и только в нужном ему объёме
+
+import os
+
+import numpy as np
+
+from .img import ImgOverlay
+from .ide import IdeIndex
+from .ipl import (
+    PLACEMENT_DTYPE, ModelNames, PlacementTable,
+    iter_ipl_placements, read_binary_ipl, append_binary_placements, stream_ipl_index,
+)
+from .log import get_logger
+
+logger = get_logger("map")
+
+# Порядок загрузки как в игре: сначала default.dat, затем gta.dat
+DEFAULT_MANIFESTS = ('data/default.dat', 'data/gta.dat')
+# Архивы, которые игра открывает без упоминания в манифесте
+DEFAULT_IMG_PATHS = ('models/gta3.img', 'models/gta_int.img')
+WATER_PATH = 'data/water.dat'
+
+MANIFEST_KEYWORDS = ('IMG', 'CDIMAGE', 'IDE', 'IPL', 'COLFILE', 'TEXDICTION', 'MODELFILE')
+
+class GameMap:
+    """Проект карты: пути всех ресурсов из манифестов и ленивые индексы поверх них.
+
+    load_region() разбирает только текстовые IPL выбранных регионов, их бинарные *_streamN.ipl
+    и ровно столько IDE, сколько нужно, чтобы найти определения встреченных моделей.
+    """
+
+    def __init__(self, game_dir, manifests=DEFAULT_MANIFESTS):
+        self.game_dir = game_dir
+        self.entries = {keyword: [] for keyword in MANIFEST_KEYWORDS}
+        self._listings = {}
+        self._ipl_paths = None
+        self._stream_ipls = None
+        self._archive = None
+        self.ide = IdeIndex()
+        for manifest in manifests:
+            manifest_path = self.resolve(manifest)
+            if manifest_path is None:
+                logger.debug(f"Манифест {manifest} не найден в {game_dir}")
+                continue
+            self._read_manifest(manifest_path)
+        self._pending_ides = list(self.entries['IDE'])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def resolve(self, relative_path):
+        """Путь к файлу игры без учёта регистра (пути в манифестах записаны как в Windows) или None."""
+        path = self.game_dir
+        for part in relative_path.replace('\\', '/').split('/'):
+            if not part:
+                continue
+            candidate = os.path.join(path, part)
+            if not os.path.exists(candidate):
+                listing = self._listings.get(path)
+                if listing is None:
+                    try:
+                        listing = {name.lower(): name for name in os.listdir(path)}
+                    except OSError:
+                        listing = {}
+                    self._listings[path] = listing
+                name = listing.get(part.lower())
+                if name is None:
+                    return None
+                candidate = os.path.join(path, name)
+            path = candidate
+        return path
+
+    def _read_manifest(self, manifest_path):
+        with open(manifest_path, 'r', errors='replace') as file:
+            for line_number, line in enumerate(file, 1):
+                comment = line.find('#')
+                if comment >= 0:
+                    line = line[:comment]
+                parts = line.split(None, 1)
+                if len(parts) < 2:
+                    continue
+                keyword, value = parts[0].upper(), parts[1].strip()
+                if keyword not in self.entries:
+                    continue
+                # COLFILE <уровень> <путь>
+                if keyword == 'COLFILE' and len(value.split(None, 1)) == 2:
+                    value = value.split(None, 1)[1]
+                path = self.resolve(value)
+                if path is None:
+                    logger.warning(f"{os.path.basename(manifest_path)}:{line_number}: файл {value} не найден")
+                    continue
+                self.entries[keyword].append(path)
+        logger.info(f"Манифест {manifest_path}: " +
+                    ", ".join(f"{keyword} {len(paths)}" for keyword, paths in self.entries.items() if paths))
+
+    @property
+    def img_paths(self):
+        """IMG-архивы в порядке возрастания приоритета, без повторов."""
+        paths = []
+        for path in [self.resolve(path) for path in DEFAULT_IMG_PATHS] + self.entries['IMG'] + self.entries['CDIMAGE']:
+            if path is not None and os.path.normcase(path) not in map(os.path.normcase, paths):
+                paths.append(path)
+        return paths
+
+    @property
+    def col_paths(self):
+        return list(self.entries['COLFILE'])
+
+    @property
+    def water_path(self):
+        return self.resolve(WATER_PATH)
+
+    @property
+    def ipl_paths(self):
+        """Текстовые IPL по региону (имя файла без расширения, в нижнем регистре)."""
+        if self._ipl_paths is None:
+            self._ipl_paths = {}
+            for path in self.entries['IPL']:
+                region = os.path.splitext(os.path.basename(path))[0].lower()
+                self._ipl_paths.setdefault(region, path)
+        return self._ipl_paths
+
+    def regions(self):
+        return list(self.ipl_paths)
+
+    @property
+    def archive(self):
+        """Объединённый IMG-архив; открывается при первом обращении (каталоги берутся из кэша индексов)."""
+        if self._archive is None:
+            self._archive = ImgOverlay.open([(path, None) for path in self.img_paths])
+        return self._archive
+
+    @property
+    def stream_ipls(self):
+        """Бинарные IPL архива по региону; каталог IMG сканируется один раз на все регионы."""
+        if self._stream_ipls is None:
+            self._stream_ipls = stream_ipl_index(self.archive.files)
+        return self._stream_ipls
+
+    def resolve_models(self, names=(), ids=(), near_dirs=()):
+        """Разбирает IDE, пока не найдены все модели names и ids: сначала IDE из папок near_dirs.
+
+        Возвращает число разобранных в этот раз IDE; ненайденные модели оставляют разобранными все IDE.
+        """
+        missing_names = {name.lower() for name in names} - self.ide.by_name.keys()
+        missing_ids = set(ids) - self.ide.by_id.keys()
+        near_dirs = {os.path.normcase(path) for path in near_dirs}
+        # Устойчивая сортировка сохраняет порядок манифеста внутри каждой группы
+        self._pending_ides.sort(key=lambda path: os.path.normcase(os.path.dirname(path)) not in near_dirs)
+
+        parsed = 0
+        while self._pending_ides and (missing_names or missing_ids):
+            self.ide.load(self._pending_ides.pop(0))
+            parsed += 1
+            missing_names -= self.ide.by_name.keys()
+            missing_ids -= self.ide.by_id.keys()
+        if missing_names or missing_ids:
+            logger.warning(f"Не найдены в IDE: {len(missing_names)} моделей по имени, {len(missing_ids)} по id")
+        return parsed
+
+    def load_region(self, regions=None):
+        """Размещения регионов (по умолчанию всех IPL манифеста): текстовые IPL и их бинарные stream IPL.
+
+        lod каждой строки остаётся номером строки в её родительском текстовом IPL, как в файлах игры.
+        """
+        if regions is None:
+            regions = self.regions()
+        names = ModelNames()
+        table = PlacementTable(np.empty(0, dtype=PLACEMENT_DTYPE), names)
+        streams = []
+        near_dirs = []
+        for region in regions:
+            ipl_path = self.ipl_paths.get(region.lower())
+            if ipl_path is None:
+                logger.warning(f"Регион {region} не найден среди IPL манифеста")
+                continue
+            near_dirs.append(os.path.dirname(ipl_path))
+            chunks = list(iter_ipl_placements(ipl_path, names))
+            parent_rows = sum(len(chunk) for chunk in chunks)
+            table.records = np.concatenate([table.records] + chunks)
+
+            for name in self.stream_ipls.get(region.lower(), []):
+                try:
+                    streams.append((name, read_binary_ipl(self.archive.get(name)).inst, parent_rows))
+                except ValueError as e:
+                    logger.warning(f"Бинарный IPL {name} пропущен: {e}")
+
+        stream_ids = set()
+        for _, inst, _ in streams:
+            stream_ids.update(np.unique(inst['id']).tolist())
+        parsed = self.resolve_models(names.names, stream_ids, near_dirs)
+
+        model_names = table.id_names()
+        model_names.update(self.ide.model_names())
+        for name, inst, parent_rows in streams:
+            append_binary_placements(table, inst, model_names, parent_rows)
+        logger.info(f"Загружено регионов: {len(near_dirs)}, бинарных IPL: {len(streams)}, "
+                    f"IDE: {parsed}, объектов: {len(table)}")
+        return table
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+            self._stream_ipls = None
@@ -22,12 +22,19 @@
 
 import bpy
 import sys
+import logging
 import os
-import bmesh
+import time
 import importlib
 import subprocess
 import numpy as np
 
+from .log import get_logger, count, log_summary
+from . import profiler
+from .profiler import phase
+
+logger = get_logger("importer")
+
 # Путь для установки Pillow внутри аддона
 addon_dir = os.path.dirname(__file__)
 pil_path = os.path.join(addon_dir, "PIL")
@@ -38,10 +45,10 @@ def ensure_pillow_installed():
     """Проверяет наличие Pillow и устанавливает его в папку аддона, если отсутствует."""
     try:
         from PIL import Image
-        print("Pillow уже доступен")
+        logger.debug("Pillow уже доступен")
         return True
     except ImportError:
-        print("Pillow не найден, пытаюсь установить в папку аддона...")
+        logger.info("Pillow не найден, пытаюсь установить в папку аддона...")
         try:
             python_exe = os.path.join(sys.prefix, "bin", "python.exe") if os.name == 'nt' else sys.executable
             subprocess.check_call([python_exe, "-m", "ensurepip"])
@@ -49,385 +56,615 @@ def ensure_pillow_installed():
             subprocess.check_call([python_exe, "-m", "pip", "install", "Pillow", "--target", pil_path, "--upgrade"])
             importlib.invalidate_caches()
             from PIL import Image
-            print("Pillow успешно установлен в папку аддона")
+            logger.info("Pillow успешно установлен в папку аддона")
             return True
         except subprocess.CalledProcessError as e:
-            print(f"Ошибка установки Pillow: {e}")
-            print("Проверьте интернет-соединение или попробуйте установить вручную.")
+            logger.error(f"Ошибка установки Pillow: {e}")
+            logger.error("Проверьте интернет-соединение или попробуйте установить вручную.")
             return False
         except Exception as e:
-            print(f"Не удалось установить Pillow: {e}")
+            logger.error(f"Не удалось установить Pillow: {e}")
             return False
 
 if not ensure_pillow_installed():
-    print("Внимание: Pillow не установлен, импорт текстур работать не будет!")
+    logger.warning("Внимание: Pillow не установлен, импорт текстур работать не будет!")
 
-from struct import unpack
-from .dff import dff
-from .txd import txd
-from PIL import Image
+from functools import partial
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from .img import ImgArchive, ImgOverlay
+from .ipl import PlacementTable, parse_ipl_table
+from .texture_cache import TextureCache
+from .model_cache import ModelCache
+from .decode import DecodePool, decode_dff, decode_txd_job, PNG_SUPPORTED
 
 def parse_ipl(ipl_path):
-    objects = []
-    with open(ipl_path, 'r') as file:
-        lines = file.readlines()
-        in_inst_section = False
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if line.lower() == 'inst':
-                in_inst_section = True
-                print(f"Начало секции 'inst' на строке {i+1}")
-                continue
-            elif line.lower() == 'end':
-                in_inst_section = False
-                print(f"Конец секции 'inst' на строке {i+1}")
-                continue
-            if in_inst_section and line and '#' not in line:
-                parts = [p.strip() for p in line.split(',')]
-                if len(parts) >= 10:
-                    try:
-                        obj_id = int(parts[0])
-                        obj = {
-                            'id': parts[0],
-                            'model_name': parts[1],
-                            'interior': parts[2],
-                            'pos': (float(parts[3]), float(parts[4]), float(parts[5])),
-                            'rot': (float(parts[9]), float(parts[6]), float(parts[7]), float(parts[8])),
-                            'lod': parts[10] if len(parts) > 10 else ''
-                        }
-                        objects.append(obj)
-                        print(f"Строка {i+1}: Успешно распарсен объект {obj['model_name']} с ID {obj['id']}")
-                    except ValueError as e:
-                        print(f"Ошибка в строке {i+1}: {line} — {e}. Строка пропущена.")
-                else:
-                    print(f"Строка {i+1} пропущена: недостаточно данных ({len(parts)} частей): {line}")
-            elif in_inst_section and '#' in line:
-                print(f"Строка {i+1} пропущена: содержит комментарий: {line}")
-    print(f"Всего распарсено {len(objects)} объектов из IPL")
-    return objects
-
-def parse_img(img_path, dir_path=None):
-    files = {}
-    if dir_path:
-        if not os.path.exists(dir_path):
-            print(f"Файл .dir не найден: {dir_path}")
-            return files
-        with open(dir_path, 'rb') as dir_file:
-            dir_data = dir_file.read()
-            for i in range(0, len(dir_data), 32):
-                offset, size, name = unpack('<II24s', dir_data[i:i+32])
-                name = name.decode('ascii').rstrip('\0').lower()
-                files[name] = (offset * 2048, size * 2048)
-    else:
-        with open(img_path, 'rb') as img_file:
-            header = img_file.read(8)
-            if header[:4] != b'VER2':
-                print(f"Неподдерживаемая версия IMG или файл поврежден: {img_path}")
-                return files
-            num_entries = unpack('<I', header[4:8])[0]
-            for _ in range(num_entries):
-                offset, size, name = unpack('<II24s', img_file.read(32))
-                name = name.decode('ascii').rstrip('\0').lower()
-                files[name] = (offset * 2048, size * 2048)
-    return files
-
-def extract_dff_and_txd_from_img(img_path, model_name, files_dict):
-    model_name = model_name.lower()
-    dff_key = model_name if model_name in files_dict else model_name + '.dff'
-    txd_key = model_name if model_name in files_dict else model_name + '.txd'
-    
-    dff_data = None
-    txd_data = None
-    
-    if dff_key not in files_dict:
-        print(f"Модель {model_name}.dff не найдена в IMG-архиве")
-    else:
-        offset, size = files_dict[dff_key]
-        with open(img_path, 'rb') as img_file:
-            img_file.seek(offset)
-            dff_data = img_file.read(size)
-        print(f"Извлечён {dff_key} из IMG")
-
-    if txd_key not in files_dict:
-        print(f"Текстуры {model_name}.txd не найдены в IMG-архиве")
-    else:
-        offset, size = files_dict[txd_key]
-        with open(img_path, 'rb') as img_file:
-            img_file.seek(offset)
-            txd_data = img_file.read(size)
-        print(f"Извлечён {txd_key} из IMG")
-    
-    return dff_data, txd_data
+    """Разбирает секции inst текстового IPL в список словарей (см. parse_ipl_table для колоночного вида)."""
+    return parse_ipl_table(ipl_path).to_dicts()
 
-def extract_textures_from_txd(txd_data, output_dir):
-    if not txd_data:
-        print("Нет данных TXD для обработки")
-        return {}
-    
+def img_entry_names(files, model_name, txd_name=None):
+    """Имена записей DFF и TXD модели в каталоге IMG; без txd_name (из IDE) TXD ищется по имени модели."""
+    model_name = model_name.lower()
+    dff_key = model_name if model_name in files else model_name + '.dff'
+    txd_name = txd_name.lower() if txd_name else model_name
+    txd_key = txd_name if txd_name in files else txd_name + '.txd'
+    return dff_key, txd_key
+
+def model_txd_keys(files, model_name, ide=None):
+    """Записи TXD модели в IMG: собственный TXD (из IDE или по имени модели), затем его родители из txdp."""
+    record = ide.get(model_name) if ide is not None else None
+    if record is None:
+        return [img_entry_names(files, model_name)[1]]
+    return [img_entry_names(files, model_name, txd_name)[1] for txd_name in ide.txd_chain(record.txd_name)]
+
+def upload_texture_images(textures, pack=False, output_dir=None):
+    """Создаёт изображения Blender из декодированных RGBA-буферов.
+
+    При pack=True изображения упаковываются в .blend, при заданном output_dir дополнительно сохраняются на диск в PNG.
+    """
     texture_dict = {}
-    txd_loader = txd()
-    try:
-        txd_loader.load_memory(txd_data)
-    except Exception as e:
-        print(f"Ошибка загрузки TXD: {e}")
-        return {}
-    
-    try:
-        os.makedirs(output_dir, exist_ok=True)
-    except Exception as e:
-        print(f"Ошибка создания директории {output_dir}: {e}")
-        return {}
-    
-    for texture in txd_loader.native_textures:
+    for texture in textures:
         try:
-            rgba_data = texture.to_rgba(level=0)
-            width = texture.get_width(0)
-            height = texture.get_height(0)
-            
-            if rgba_data and width > 0 and height > 0:
-                img = Image.frombytes("RGBA", (width, height), rgba_data)
+            with phase('image_upload'):
+                # Строки TXD идут сверху вниз, а пиксели Blender — снизу вверх
+                pixels = np.frombuffer(texture.rgba, dtype=np.uint8, count=texture.width * texture.height * 4)
+                pixels = pixels.reshape(texture.height, texture.width, 4)[::-1].astype(np.float32) / 255.0
+
+                image = bpy.data.images.new(texture.name, width=texture.width, height=texture.height, alpha=True)
+                image.pixels.foreach_set(pixels.ravel())
+                image.update()
+
+            if output_dir:
                 texture_path = os.path.join(output_dir, f"{texture.name}.png")
-                img.save(texture_path, "PNG")
-                texture_dict[texture.name.lower()] = texture_path
-                print(f"Сохранена текстура: {texture_path}")
-            else:
-                print(f"Не удалось декодировать текстуру {texture.name}: нет данных или неверные размеры")
+                with phase('png_write'):
+                    image.filepath_raw = texture_path
+                    image.file_format = 'PNG'
+                    image.save()
+                logger.debug("Сохранена текстура: %s", texture_path)
+            if pack:
+                with phase('image_upload'):
+                    image.pack()
+
+            texture_dict[texture.name.lower()] = image
+            logger.debug("Текстура %s загружена в Blender (%dx%d)", texture.name, texture.width, texture.height)
         except Exception as e:
-            print(f"Ошибка сохранения текстуры {texture.name}: {e}")
+            logger.error(f"Ошибка создания изображения {texture.name}: {e}")
             continue
-    
+
     return texture_dict
 
-def filter_triangles(vertices, triangles):
-    """Фильтрует дегенеративные треугольники."""
-    filtered = []
-    for tri in triangles:
-        if tri.b >= len(vertices) or tri.a >= len(vertices) or tri.c >= len(vertices):
-            print(f"Пропущен треугольник: неверные индексы b={tri.b}, a={tri.a}, c={tri.c}")
-            continue
-        v0 = np.array([vertices[tri.a].x, vertices[tri.a].y, vertices[tri.a].z])
-        v1 = np.array([vertices[tri.b].x, vertices[tri.b].y, vertices[tri.b].z])
-        v2 = np.array([vertices[tri.c].x, vertices[tri.c].y, vertices[tri.c].z])
-        if np.allclose(v0, v1) or np.allclose(v1, v2) or np.allclose(v0, v2):
-            print(f"Пропущен треугольник: дегенеративный (b={tri.b}, a={tri.a}, c={tri.c})")
-            continue
-        filtered.append(tri)
-    print(f"Отфильтровано треугольников: {len(triangles)} -> {len(filtered)}")
-    return filtered
+def build_mesh(mesh, vertices, triangles, uv_arrays, materials_count):
+    """Заполняет меш целиком через foreach_set из массивов геометрии.
+
+    triangles — массив (N, 4) в порядке полей Triangle: b, a, material, c.
+    """
+    faces = np.ascontiguousarray(triangles[:, [1, 0, 3]], dtype=np.int32)
+    num_faces = len(faces)
+    num_loops = num_faces * 3
+
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", np.ascontiguousarray(vertices, dtype=np.float32).ravel())
+
+    mesh.loops.add(num_loops)
+    mesh.loops.foreach_set("vertex_index", faces.ravel())
+
+    mesh.polygons.add(num_faces)
+    mesh.polygons.foreach_set("loop_start", np.arange(0, num_loops, 3, dtype=np.int32))
+    # В Blender 4.0+ loop_total вычисляется из loop_start и доступен только для чтения
+    if bpy.app.version < (4, 0, 0):
+        mesh.polygons.foreach_set("loop_total", np.full(num_faces, 3, dtype=np.int32))
+
+    material_index = triangles[:, 2]
+    material_index = np.where(material_index < materials_count, material_index, 0).astype(np.int32)
+    mesh.polygons.foreach_set("material_index", material_index)
+
+    loop_vertices = faces.ravel()
+    for i, uvs in enumerate(uv_arrays):
+        logger.debug("Создан UV-слой: UVMap_%d", i)
+        loop_uvs = np.array(uvs, dtype=np.float32)[loop_vertices]
+        loop_uvs[:, 1] = 1.0 - loop_uvs[:, 1]
+        uv_layer = mesh.uv_layers.new(name=f"UVMap_{i}")
+        uv_layer.data.foreach_set("uv", loop_uvs.ravel())
+
+    mesh.update(calc_edges=True)
+    # Удаляет повторяющиеся грани, которые bmesh раньше отбрасывал при создании
+    if mesh.validate(clean_customdata=False):
+        logger.debug(f"Меш {mesh.name}: исправлены некорректные или повторяющиеся грани")
+
+def material_key(spec, texture_dict):
+    """Ключ кэша материалов: текстура (и её источник), цвет и настройки MatFX/specular/reflection."""
+    source = None
+    if spec.tex_name and spec.tex_name in texture_dict:
+        texture = texture_dict[spec.tex_name]
+        source = texture if isinstance(texture, str) else ('image', texture.name)
+    return (spec.tex_name, source, spec.color, spec.plugins)
+
+def create_material(mat_name, spec, texture_dict):
+    """Создаёт материал Blender с узлами Principled BSDF и, если есть, Image Texture."""
+    has_texture = spec.tex_name is not None
+    tex_name = spec.tex_name
+
+    bpy_mat = bpy.data.materials.new(name=mat_name)
+    bpy_mat.use_nodes = True
+    nodes = bpy_mat.node_tree.nodes
+    links = bpy_mat.node_tree.links
+
+    principled = nodes.new("ShaderNodeBsdfPrincipled")
+    output = nodes.get("Material Output") or nodes.new("ShaderNodeOutputMaterial")
+    links.new(principled.outputs["BSDF"], output.inputs["Surface"])
+
+    # Создаём узел Image Texture в любом случае, если есть текстура
+    if has_texture:
+        tex_node = nodes.new("ShaderNodeTexImage")
+        # Текстура, уже созданная в Blender, подключается напрямую
+        if tex_name in texture_dict and not isinstance(texture_dict[tex_name], str):
+            tex_node.image = texture_dict[tex_name]
+            logger.debug("Текстура %s подключена из памяти", tex_name)
+        # Если текстура импортируется (есть в texture_dict), загружаем её
+        elif tex_name in texture_dict:
+            texture_path = texture_dict[tex_name]
+            try:
+                if os.path.exists(texture_path):
+                    tex_node.image = bpy.data.images.load(texture_path, check_existing=True)
+                    logger.debug("Текстура %s загружена из %s", tex_name, texture_path)
+                else:
+                    logger.warning(f"Текстура {tex_name} не найдена по пути {texture_path}")
+            except Exception as e:
+                logger.error(f"Ошибка загрузки текстуры {tex_name}: {e}")
+        # Если текстуры не импортируются, задаём относительный путь, предполагая, что текстура в той же папке
+        else:
+            tex_image_name = f"{tex_name}.png"
+            tex_node.image = bpy.data.images.new(name=tex_image_name, width=1, height=1)
+            tex_node.image.source = 'FILE'
+            # Задаём относительный путь вида "//tex_name.png"
+            tex_node.image.filepath = f"//{tex_image_name}"
+            logger.debug("Задана текстура %s с относительным путём для поиска в папке с .blend", tex_image_name)
+        links.new(tex_node.outputs["Color"], principled.inputs["Base Color"])
+    # Если текстуры нет, используем цвет, если он есть
+    elif spec.color:
+        color = tuple(channel / 255.0 for channel in spec.color)
+        principled.inputs["Base Color"].default_value = color
+        logger.debug("Установлен цвет материала %s: %s", mat_name, color)
+
+    return bpy_mat
+
+def import_dff(model_name, dff_source, texture_dict=None, material_cache=None):
+    logger.debug(f"Начало импорта модели: {model_name}")
+    payload = decode_dff(model_name, dff_source)
+    if payload is None:
+        return None
+    return create_model(model_name, payload, texture_dict, material_cache)
 
-def import_dff(model_name, dff_source, texture_dict=None):
+def create_model(model_name, payload, texture_dict=None, material_cache=None):
+    """Создаёт меш и объект Blender из декодированной модели (ModelPayload)."""
     if texture_dict is None:
         texture_dict = {}
-    
-    print(f"Начало импорта модели: {model_name}")
-    dff_loader = dff()
-    
-    try:
-        if isinstance(dff_source, str):
-            dff_path = os.path.join(dff_source, model_name + '.dff')
-            if not os.path.exists(dff_path):
-                print(f"Ошибка: Файл {dff_path} не найден")
-                return None
-            print(f"Загрузка DFF из файла: {dff_path}")
-            dff_loader.load_file(dff_path)
-        else:
-            if dff_source is None:
-                print(f"Ошибка: Данные для модели {model_name} не предоставлены")
-                return None
-            print(f"Загрузка DFF из памяти для модели: {model_name}")
-            dff_loader.load_memory(dff_source)
-    except Exception as e:
-        print(f"Ошибка при загрузке DFF для {model_name}: {e}")
-        return None
-    
-    if not dff_loader.geometry_list:
-        print(f"Ошибка: Не удалось загрузить геометрию для {model_name}")
-        return None
 
-    geometry = dff_loader.geometry_list[0]
-    print(f"Геометрия загружена: {len(geometry.vertices)} вершин, {len(geometry.triangles)} треугольников")
-
-    triangles = geometry.extensions.get('mat_split', geometry.triangles)
-    triangles = filter_triangles(geometry.vertices, triangles)
-    print(f"Источник треугольников: {'Bin Mesh PLG' if triangles is not geometry.triangles else 'Geometry'}, всего {len(triangles)}")
-
-    mesh = bpy.data.meshes.new(model_name)
-    obj = bpy.data.objects.new(model_name, mesh)
-    bm = bmesh.new()
-
-    print(f"Добавление {len(geometry.vertices)} вершин в меш")
-    for vert in geometry.vertices:
-        bm.verts.new((vert.x, vert.y, vert.z))
-    bm.verts.ensure_lookup_table()
-
-    uv_layers = []
-    for i in range(len(geometry.uv_layers)):
-        uv_layer = bm.loops.layers.uv.new(f"UVMap_{i}")
-        uv_layers.append(uv_layer)
-        print(f"Создан UV-слой: UVMap_{i}")
-
-    material_indices = {}
-    if geometry.materials:
-        print(f"Обнаружено {len(geometry.materials)} материалов")
-        for i, mat in enumerate(geometry.materials):
-            mat_name = f"{model_name}_mat_{i}"
-            has_texture = mat.textures and len(mat.textures) > 0
-
-            if has_texture:
-                tex_name = mat.textures[0].name.lower()
-                mat_name = tex_name if tex_name else mat_name
-                print(f"Материал {i}: {mat_name} с текстурой {tex_name}")
-            else:
-                print(f"Материал {i}: {mat_name} без текстуры")
-
-            bpy_mat = bpy.data.materials.new(name=mat_name)
-            bpy_mat.use_nodes = True
-            nodes = bpy_mat.node_tree.nodes
-            links = bpy_mat.node_tree.links
-
-            principled = nodes.new("ShaderNodeBsdfPrincipled")
-            output = nodes.get("Material Output") or nodes.new("ShaderNodeOutputMaterial")
-            links.new(principled.outputs["BSDF"], output.inputs["Surface"])
-
-            # Создаём узел Image Texture в любом случае, если есть текстура
-            if has_texture:
-                tex_node = nodes.new("ShaderNodeTexImage")
-                # Если текстура импортируется (есть в texture_dict), загружаем её
-                if tex_name in texture_dict:
-                    texture_path = texture_dict[tex_name]
-                    try:
-                        if os.path.exists(texture_path):
-                            tex_node.image = bpy.data.images.load(texture_path, check_existing=True)
-                            print(f"Текстура {tex_name} загружена из {texture_path}")
-                        else:
-                            print(f"Текстура {tex_name} не найдена по пути {texture_path}")
-                    except Exception as e:
-                        print(f"Ошибка загрузки текстуры {tex_name}: {e}")
-                # Если текстуры не импортируются, задаём относительный путь, предполагая, что текстура в той же папке
-                else:
-                    tex_image_name = f"{tex_name}.png"
-                    tex_node.image = bpy.data.images.new(name=tex_image_name, width=1, height=1)
-                    tex_node.image.source = 'FILE'
-                    # Задаём относительный путь вида "//tex_name.png"
-                    tex_node.image.filepath = f"//{tex_image_name}"
-                    print(f"Задана текстура {tex_image_name} с относительным путём для поиска в папке с .blend")
-                links.new(tex_node.outputs["Color"], principled.inputs["Base Color"])
-            # Если текстуры нет, используем цвет, если он есть
-            elif mat.color:
-                color = (mat.color.r / 255.0, mat.color.g / 255.0, mat.color.b / 255.0, mat.color.a / 255.0)
-                principled.inputs["Base Color"].default_value = color
-                print(f"Установлен цвет материала {mat_name}: {color}")
-
-            mesh.materials.append(bpy_mat)
-            material_indices[i] = i
-
-    material_usage = {i: 0 for i in range(len(geometry.materials))}
-    for tri in triangles:
-        if tri.material in material_usage:
-            material_usage[tri.material] += 1
-
-    print("Использование материалов:")
-    for mat_idx, count in material_usage.items():
-        print(f"Материал {mat_idx}: {count} треугольников")
-
-    skipped_triangles = 0
-    for tri in triangles:
-        try:
-            face = bm.faces.new((bm.verts[tri.a], bm.verts[tri.b], bm.verts[tri.c]))
-            if tri.material in material_indices:
-                face.material_index = material_indices[tri.material]
-            else:
-                face.material_index = 0
-            
-            for uv_layer_idx, uv_layer in enumerate(uv_layers):
-                if uv_layer_idx < len(geometry.uv_layers):
-                    for i, loop in enumerate(face.loops):
-                        vert_idx = [tri.a, tri.b, tri.c][i]
-                        uv = geometry.uv_layers[uv_layer_idx][vert_idx]
-                        loop[uv_layer].uv = (uv.u, 1.0 - uv.v)
-        except ValueError as e:
-            skipped_triangles += 1
-            print(f"Пропущен треугольник в модели {model_name}: {e}")
-            continue
+    triangle_array = payload.triangles
+    logger.debug(f"Источник треугольников: {'Bin Mesh PLG' if payload.has_mat_split else 'Geometry'}, всего {len(triangle_array)}")
 
-    if skipped_triangles > 0:
-        print(f"Пропущено {skipped_triangles} треугольников из-за ошибок")
+    with phase('mesh_build'):
+        mesh = bpy.data.meshes.new(model_name)
+        obj = bpy.data.objects.new(model_name, mesh)
 
-    bm.to_mesh(mesh)
-    bm.free()
+    with phase('material_build'):
+        if payload.materials:
+            logger.debug(f"Обнаружено {len(payload.materials)} материалов")
+            for i, spec in enumerate(payload.materials):
+                mat_name = f"{model_name}_mat_{i}"
+                has_texture = spec.tex_name is not None
+
+                if has_texture:
+                    tex_name = spec.tex_name
+                    mat_name = tex_name if tex_name else mat_name
+                    logger.debug("Материал %d: %s с текстурой %s", i, mat_name, tex_name)
+                else:
+                    logger.debug("Материал %d: %s без текстуры", i, mat_name)
 
-    if geometry.uv_layers and len(geometry.uv_layers) > 0:
+                # Одинаковые материалы разных моделей создаются один раз и разделяются
+                key = material_key(spec, texture_dict) if material_cache is not None else None
+                bpy_mat = material_cache.get(key) if key is not None else None
+                if bpy_mat is not None:
+                    try:
+                        bpy_mat.name
+                        count('materials_shared')
+                        logger.debug("Материал %s взят из кэша", bpy_mat.name)
+                    except ReferenceError:
+                        bpy_mat = None
+                if bpy_mat is None:
+                    bpy_mat = create_material(mat_name, spec, texture_dict)
+                    count('materials_created')
+                    if key is not None:
+                        material_cache[key] = bpy_mat
+
+                mesh.materials.append(bpy_mat)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        material_usage = np.bincount(triangle_array[:, 2], minlength=len(payload.materials))
+        logger.debug("Использование материалов:")
+        for mat_idx in range(len(payload.materials)):
+            logger.debug("Материал %d: %d треугольников", mat_idx, material_usage[mat_idx])
+
+    with phase('mesh_build'):
+        build_mesh(mesh, payload.vertices, triangle_array, payload.uv_arrays, len(payload.materials))
+
+    if payload.uv_arrays and len(payload.uv_arrays) > 0:
         mesh.uv_layers[0].name = "UVMap"
         mesh.uv_layers[0].active = True
-        print(f"UV-слой активирован: UVMap")
+        logger.debug(f"UV-слой активирован: UVMap")
 
-    print(f"Импорт модели {model_name} завершён успешно")
+    logger.debug(f"Импорт модели {model_name} завершён успешно")
     return obj
 
-def place_objects(objects, dff_folder=None, img_path=None, dir_path=None):
-    files_dict = None
-    if img_path:
-        if not os.path.exists(img_path):
-            print(f"Ошибка: IMG-архив не найден: {img_path}")
-            return
-        files_dict = parse_img(img_path, dir_path)
-        print(f"IMG-архив распарсен, найдено {len(files_dict)} файлов")
+def place_objects(objects, dff_folder=None, img_path=None, dir_path=None, extra_img_paths=None, ide=None):
+    for _ in place_objects_iter(objects, dff_folder, img_path, dir_path, extra_img_paths, ide):
+        pass
+
+def place_objects_iter(objects, dff_folder=None, img_path=None, dir_path=None, extra_img_paths=None, ide=None):
+    """Импорт по шагам: после каждого размещения выдаёт число обработанных строк IPL.
+
+    objects — PlacementTable или список словарей parse_ipl; ide — IdeIndex, из которого берутся TXD моделей.
+    Используется модальным оператором; закрытие итератора прерывает импорт, освобождая архив и пул процессов.
+    """
+    if not isinstance(objects, PlacementTable):
+        objects = PlacementTable.from_dicts(objects)
+    if img_path and not os.path.exists(img_path):
+        logger.error(f"Ошибка: IMG-архив не найден: {img_path}")
+        return
     
-    # Определяем папку для текстур только если импорт текстур включён
+    # Определяем папку для текстур только если импорт текстур включён и текстуры пишутся на диск
     import_textures = bpy.context.scene.get('import_textures', False)  # По умолчанию False
+    texture_mode = getattr(bpy.context.scene, 'texture_mode', 'PNG')
+    save_texture_files = texture_mode != 'MEMORY' or getattr(bpy.context.scene, 'save_texture_files', False)
     texture_output_dir = None
-    if import_textures:
+    if import_textures and save_texture_files:
         if bpy.data.filepath:
             texture_output_dir = os.path.join(os.path.dirname(bpy.data.filepath), "textures")
-            print(f"Текстуры будут сохранены в: {texture_output_dir}")
+            logger.info(f"Текстуры будут сохранены в: {texture_output_dir}")
         else:
             import tempfile
             texture_output_dir = os.path.join(tempfile.gettempdir(), "gta_textures")
-            print(f"Файл .blend не сохранён, текстуры будут сохранены во временную папку: {texture_output_dir}")
+            logger.info(f"Файл .blend не сохранён, текстуры будут сохранены во временную папку: {texture_output_dir}")
         
         try:
             os.makedirs(texture_output_dir, exist_ok=True)
         except PermissionError as e:
-            print(f"Ошибка создания папки {texture_output_dir}: {e}")
-            print("Попробуйте запустить Blender от имени администратора или сохранить .blend в другой директории")
+            logger.error(f"Ошибка создания папки {texture_output_dir}: {e}")
+            logger.error("Попробуйте запустить Blender от имени администратора или сохранить .blend в другой директории")
             return
     
-    for obj_data in objects:
-        model_name = obj_data['model_name']
-        print(f"Обработка объекта: {model_name}")
+    # Архив открывается один раз на весь импорт, записи читаются из mmap без копирования
+    # Дополнительные архивы (gta_int.img, моды) перекрывают основной в порядке перечисления
+    archive = None
+    if img_path:
+        if extra_img_paths:
+            archive = ImgOverlay.open([(img_path, dir_path)] + [(path, None) for path in extra_img_paths])
+            logger.info(f"Открыто {len(archive.archives)} IMG-архивов, найдено {len(archive)} уникальных файлов")
+        else:
+            archive = ImgArchive(img_path, dir_path)
+            logger.info(f"IMG-архив распарсен, найдено {len(archive)} файлов")
+
+    # TXD, общие для многих моделей, декодируются один раз за импорт (или берутся из постоянного кэша)
+    texture_cache = None
+    if import_textures:
+        decode = partial(decode_txd_job, texture_mode.lower())
+        if texture_mode == 'PNG' and not PNG_SUPPORTED:
+            logger.warning("Pillow не установлен: текстуры не будут извлечены в PNG. Выберите режим «Напрямую в Blender»")
+        elif texture_mode == 'DDS' and not PNG_SUPPORTED:
+            logger.warning("Pillow не установлен: будут извлечены только сжатые DXT-текстуры в DDS")
+        finish = None
+        if texture_mode == 'MEMORY':
+            finish = partial(upload_texture_images, pack=getattr(bpy.context.scene, 'pack_textures', False),
+                             output_dir=texture_output_dir)
+        persistent = texture_output_dir is not None and bpy.context.scene.get('persistent_texture_cache', False)
+        texture_cache = TextureCache(texture_output_dir, decode, finish, persistent, texture_mode.lower())
+
+    # Параллельное декодирование: 0 процессов означает все ядра
+    workers = None
+    if getattr(bpy.context.scene, 'parallel_decode', False):
+        workers = getattr(bpy.context.scene, 'decode_workers', 0)
+
+    # Постоянный кэш моделей: повторный импорт читает готовую геометрию вместо разбора DFF
+    model_cache = None
+    if getattr(bpy.context.scene, 'persistent_model_cache', False):
+        if bpy.data.filepath:
+            model_cache_dir = os.path.join(os.path.dirname(bpy.data.filepath), "model_cache")
+        else:
+            import tempfile
+            model_cache_dir = os.path.join(tempfile.gettempdir(), "gta_model_cache")
         try:
-            if img_path and files_dict:
-                dff_data, txd_data = extract_dff_and_txd_from_img(img_path, model_name, files_dict)
-                # Извлекаем текстуры только если import_textures включён
-                texture_dict = {}
-                if import_textures and txd_data:
-                    texture_dict = extract_textures_from_txd(txd_data, texture_output_dir)
-                    # Если .blend сохранён, преобразуем пути текстур в относительные
-                    if bpy.data.filepath:
-                        rel_texture_dict = {}
-                        for tex_name, tex_path in texture_dict.items():
-                            rel_path = bpy.path.relpath(tex_path)
-                            rel_texture_dict[tex_name] = rel_path
-                            print(f"Преобразован путь текстуры {tex_name}: {tex_path} -> {rel_path}")
-                        texture_dict = rel_texture_dict
-                obj = import_dff(model_name, dff_data, texture_dict)
-            else:
-                obj = import_dff(model_name, dff_folder)
-            
-            if obj:
-                obj.location = obj_data['pos']
-                obj.rotation_mode = 'QUATERNION'
-                obj.rotation_quaternion = obj_data['rot']
-                obj['id'] = int(obj_data['id'])
-                obj['interior'] = int(obj_data['interior'])
-                obj['lod'] = int(obj_data['lod']) if obj_data['lod'] else -1
-                bpy.context.collection.objects.link(obj)
-                print(f"Объект {model_name} успешно размещён")
-            else:
-                print(f"Пропущен объект {model_name} из-за ошибки импорта")
+            model_cache = ModelCache(model_cache_dir, getattr(bpy.context.scene, 'model_cache_size', 0) * 2**20)
+        except OSError as e:
+            logger.warning(f"Кэш моделей отключён, не удалось открыть папку {model_cache_dir}: {e}")
+
+    if getattr(bpy.context.scene, 'profile_import', False):
+        profiler.start(getattr(bpy.context.scene, 'profile_slowest', 10))
+
+    try:
+        yield from _place_objects(objects, dff_folder, archive, texture_cache, workers, model_cache, ide)
+    finally:
+        if archive is not None:
+            archive.close()
+        if texture_cache is not None:
+            logger.debug(f"Кэш текстур: {texture_cache.hits} попаданий, {texture_cache.misses} декодирований TXD")
+            texture_cache.save()
+        if model_cache is not None:
+            logger.debug(f"Кэш моделей: {model_cache.hits} попаданий, {model_cache.misses} новых моделей")
+        log_summary("Импорт IPL")
+        _report_profile(profiler.stop())
+
+def _report_profile(import_profiler):
+    """Выводит отчёт профилировщика в лог или, для JSON с заданным путём, записывает его в файл."""
+    if import_profiler is None:
+        return
+    if getattr(bpy.context.scene, 'profile_format', 'TEXT') != 'JSON':
+        logger.info(import_profiler.report_text())
+        return
+    report = import_profiler.report_json()
+    profile_path = bpy.path.abspath(getattr(bpy.context.scene, 'profile_path', ''))
+    if not profile_path:
+        logger.info(report)
+        return
+    try:
+        with open(profile_path, 'w', encoding='utf-8') as file:
+            file.write(report)
+        logger.info(f"Профиль импорта сохранён: {profile_path}")
+    except OSError as e:
+        logger.error(f"Ошибка записи профиля {profile_path}: {e}")
+        logger.info(report)
+
+def _place_objects(objects, dff_folder, archive, texture_cache, workers=None, model_cache=None, ide=None):
+    # Все нужные записи читаются заранее одним проходом по архиву в порядке смещений;
+    # TXD каждой модели определяется один раз, а не при каждом размещении
+    groups = objects.groups()
+    entries = None
+    txd_keys = {}
+    if archive is not None and len(archive):
+        needed = set()
+        with phase('img_lookup'):
+            for model_name in groups:
+                needed.add(img_entry_names(archive.files, model_name)[0])
+                if texture_cache is not None:
+                    txd_keys[model_name] = model_txd_keys(archive.files, model_name, ide)
+                    needed.update(txd_keys[model_name])
+        with phase('entry_read'):
+            entries = archive.read_batch(needed)
+
+    pool = None
+    if workers is not None and len(groups) > 1:
+        try:
+            pool = DecodePool(workers)
+            logger.info(f"Параллельное декодирование: {pool.workers} процессов")
         except Exception as e:
-            print(f"Ошибка при размещении объекта {model_name}: {e}")
+            logger.warning(f"Не удалось запустить процессы декодирования, модели будут обработаны последовательно: {e}")
+
+    # Материалы с одинаковой текстурой, цветом и настройками плагинов разделяются между моделями
+    material_cache = {}
+    done = 0
+    try:
+        if pool is not None:
+            decoded = _decode_models_parallel(pool, groups, dff_folder, archive, entries, texture_cache, model_cache, txd_keys)
+        else:
+            decoded = _decode_models(groups, dff_folder, archive, entries, texture_cache, model_cache, txd_keys)
+
+        for model_name, payload, texture_dict in decoded:
+            placements = groups[model_name]
+            logger.debug("Обработка модели: %s (%d размещений)", model_name, len(placements))
+            template = None
+            if payload is not None:
+                count('triangles_filtered', payload.filtered)
+                started = time.perf_counter()
+                try:
+                    template = create_model(model_name, payload, texture_dict, material_cache)
+                except Exception as e:
+                    logger.error(f"Ошибка при импорте модели {model_name}: {e}")
+                profiler.add_model(model_name, time.perf_counter() - started)
+
+            if template is None:
+                count('models_failed')
+                logger.warning(f"Пропущено {len(placements)} объектов {model_name} из-за ошибки импорта")
+                done += len(placements)
+                yield done
+                continue
+
+            count('models_imported')
+            for i, record in enumerate(objects.rows(placements)):
+                try:
+                    # Первое размещение использует импортированный объект, остальные разделяют его меш
+                    with phase('object_link'):
+                        obj = template if i == 0 else bpy.data.objects.new(model_name, template.data)
+                        _place_object(obj, record)
+                    count('objects_placed')
+                except Exception as e:
+                    logger.error(f"Ошибка при размещении объекта {model_name}: {e}")
+                done += 1
+                yield done
+    finally:
+        if pool is not None:
+            pool.close()
+
+    logger.debug(f"Создано уникальных материалов: {len(material_cache)}")
+
+def _model_sources(model_name, dff_folder, archive, entries, txd_keys=None):
+    """Источник DFF (папка или данные из IMG) и список (запись TXD, данные TXD): TXD модели, затем родители."""
+    if archive is None or not len(archive):
+        return dff_folder, []
+    with phase('img_lookup'):
+        keys = (txd_keys or {}).get(model_name) or [img_entry_names(archive.files, model_name)[1]]
+        txd_sources = []
+        for txd_key in keys:
+            txd_data = entries.get(txd_key) if entries is not None else archive.get(txd_key)
+            if txd_data is not None:
+                txd_sources.append((txd_key, txd_data))
+            else:
+                logger.debug("Текстуры %s для модели %s не найдены в IMG-архиве", txd_key, model_name)
+        dff_key = img_entry_names(archive.files, model_name)[0]
+        dff_data = entries.get(dff_key) if entries is not None else archive.get(dff_key)
+        if dff_data is None:
+            logger.warning(f"Модель {model_name.lower()}.dff не найдена в IMG-архиве")
+        return dff_data, txd_sources
+
+def _relative_texture_paths(texture_dict):
+    # Если .blend сохранён, преобразуем пути текстур в относительные
+    if not bpy.data.filepath:
+        return texture_dict
+    rel_texture_dict = {}
+    for tex_name, tex_path in texture_dict.items():
+        if not isinstance(tex_path, str):
+            rel_texture_dict[tex_name] = tex_path
             continue
+        rel_path = bpy.path.relpath(tex_path)
+        rel_texture_dict[tex_name] = rel_path
+        logger.debug("Преобразован путь текстуры %s: %s -> %s", tex_name, tex_path, rel_path)
+    return rel_texture_dict
+
+def _model_cache_lookup(model_name, dff_source, model_cache):
+    """Ищет модель в постоянном кэше: (ключ, ModelPayload или None, источник DFF для декодирования).
+
+    DFF из папки читается в память, чтобы ключ зависел от содержимого, а не от пути.
+    """
+    if model_cache is None or dff_source is None:
+        return None, None, dff_source
+    if isinstance(dff_source, str):
+        dff_path = os.path.join(dff_source, model_name + '.dff')
+        if not os.path.exists(dff_path):
+            return None, None, dff_source
+        with open(dff_path, 'rb') as dff_file:
+            dff_source = dff_file.read()
+    with phase('model_cache'):
+        key = model_cache.key(dff_source)
+        return key, model_cache.load(key), dff_source
+
+def _store_model(model_cache, key, payload):
+    if key is not None and payload is not None:
+        with phase('model_cache'):
+            model_cache.store(key, payload)
+
+def _decode_models(groups, dff_folder, archive, entries, texture_cache, model_cache=None, txd_keys=None):
+    """Последовательно декодирует модели в главном потоке: (имя, ModelPayload или None, словарь текстур)."""
+    for model_name in groups:
+        payload, texture_dict = None, {}
+        started = time.perf_counter()
+        try:
+            dff_source, txd_sources = _model_sources(model_name, dff_folder, archive, entries, txd_keys)
+            # Извлекаем текстуры только если import_textures включён; текстуры модели перекрывают родительские
+            if texture_cache is not None and txd_sources:
+                for txd_key, txd_data in reversed(txd_sources):
+                    texture_dict.update(texture_cache.get_or_extract(txd_key, txd_data))
+                texture_dict = _relative_texture_paths(texture_dict)
+            key, payload, dff_source = _model_cache_lookup(model_name, dff_source, model_cache)
+            if payload is None:
+                payload = decode_dff(model_name, dff_source)
+                _store_model(model_cache, key, payload)
+        except Exception as e:
+            logger.error(f"Ошибка при импорте модели {model_name}: {e}")
+        profiler.add_model(model_name, time.perf_counter() - started)
+        yield model_name, payload, texture_dict
+
+def _decode_models_parallel(pool, groups, dff_folder, archive, entries, texture_cache, model_cache=None, txd_keys=None):
+    """Раздаёт DFF и непрочитанные из кэша TXD процессам пула и выдаёт модели по мере готовности.
+
+    Данные каждой записи копируются при передаче в процесс, поэтому в работе одновременно не больше
+    pool.window моделей: следующая модель отправляется, когда готова одна из предыдущих. Если процесс
+    пула падает, ещё не выданные модели декодируются последовательно в главном потоке.
+    """
+    model_futures = {}
+    model_keys = {}
+    model_textures = {}
+    txd_futures = {}
+    pending = iter(groups)
+    yielded = set()
+
+    def submit_next():
+        model_name = next(pending, None)
+        if model_name is None:
+            return
+        dff_source, txd_sources = _model_sources(model_name, dff_folder, archive, entries, txd_keys)
+        if texture_cache is not None and txd_sources:
+            keys = []
+            for txd_key, txd_data in txd_sources:
+                key, texture_dict = texture_cache.lookup(txd_key, txd_data)
+                if texture_dict is None and key not in txd_futures:
+                    txd_futures[key] = (txd_key, pool.submit_textures(texture_cache.decode, txd_data, texture_cache.output_dir))
+                elif texture_dict is None:
+                    texture_cache.hits += 1
+                    count('txd_cache_hits')
+                keys.append(key)
+            model_textures[model_name] = keys
+        try:
+            model_key, payload, dff_source = _model_cache_lookup(model_name, dff_source, model_cache)
+        except OSError as e:
+            logger.error(f"Ошибка чтения DFF для {model_name}: {e}")
+            model_key, payload = None, None
+        if payload is not None:
+            # Модель из кэша оформляется готовым future и выдаётся первой
+            future = Future()
+            future.set_result(payload)
+        else:
+            future = pool.submit_model(model_name, dff_source)
+            model_keys[model_name] = model_key
+        model_futures[future] = model_name
+
+    try:
+        for _ in range(pool.window):
+            submit_next()
+
+        while model_futures:
+            # Время ожидания считается от выдачи предыдущей модели, так что в pool_wait не попадает работа главного потока
+            with phase('pool_wait'):
+                done, _ = wait(model_futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                model_name = model_futures.pop(future)
+                submit_next()
+                payload, texture_dict = None, {}
+                try:
+                    payload = future.result()
+                    _store_model(model_cache, model_keys.pop(model_name, None), payload)
+                    keys = model_textures.pop(model_name, None)
+                    if keys:
+                        # Результат TXD доводится в главном потоке один раз, следующие модели берут его из кэша
+                        for key in keys:
+                            if key in txd_futures:
+                                _finish_txd(texture_cache, key, *txd_futures.pop(key))
+                        # Текстуры модели перекрывают текстуры родительских TXD
+                        texture_dict = {}
+                        for key in reversed(keys):
+                            texture_dict.update(texture_cache.entries.get(key, {}))
+                        texture_dict = _relative_texture_paths(texture_dict)
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    logger.error(f"Ошибка при импорте модели {model_name}: {e}")
+                yielded.add(model_name)
+                yield model_name, payload, texture_dict
+    except BrokenProcessPool as e:
+        remaining = [model_name for model_name in groups if model_name not in yielded]
+        logger.error(f"Процесс декодирования завершился аварийно, {len(remaining)} моделей будут обработаны последовательно: {e}")
+        yield from _decode_models(remaining, dff_folder, archive, entries, texture_cache, model_cache, txd_keys)
+
+def _finish_txd(texture_cache, key, txd_key, future):
+    """Доводит результат TXD из пула; ошибка TXD не мешает импорту модели, TXD помечается неудачным."""
+    try:
+        with phase('pool_wait'):
+            txd_result = future.result()
+    except BrokenProcessPool:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка декодирования TXD {txd_key}: {e}")
+        texture_cache.fail(key)
+        return
+    texture_cache.store(key, txd_result)
+
+def _place_object(obj, record):
+    """Размещает объект по строке PlacementTable.rows()."""
+    obj_id, _, interior, pos, (x, y, z, w), lod = record
+    obj.location = pos
+    obj.rotation_mode = 'QUATERNION'
+    obj.rotation_quaternion = (w, x, y, z)
+    obj['id'] = obj_id
+    obj['interior'] = interior
+    obj['lod'] = lod
+    bpy.context.collection.objects.link(obj)
 
 def export_ipl(ipl_path, objects, lod_autosearch=False):
     lod_dict = {}
@@ -452,7 +689,7 @@ def export_ipl(ipl_path, objects, lod_autosearch=False):
             line = f"{obj['id']}, {model_name}, {interior}, {pos[0]:.6f}, {pos[1]:.6f}, {pos[2]:.6f}, {rot[1]:.6f}, {rot[2]:.6f}, {rot[3]:.6f}, {rot[0]:.6f}, {lod_index}\n"
             file.write(line)
         file.write("end\n")
-    print(f"Экспортировано {len(objects)} объектов в IPL: {ipl_path}")
+    logger.info(f"Экспортировано {len(objects)} объектов в IPL: {ipl_path}")
 
 def export_ide(ide_path, objects):
     with open(ide_path, 'w') as file:
@@ -467,7 +704,7 @@ def export_ide(ide_path, objects):
             line = f"{obj['id']}, {model_name}, {txd_name}, {distance:.1f}, {flags}\n"
             file.write(line)
         file.write("end\n")
-    print(f"Экспортировано {len(objects)} объектов в IDE: {ide_path}")
+    logger.info(f"Экспортировано {len(objects)} объектов в IDE: {ide_path}")
 
 def check_errors(objects):
     errors = []
@@ -22,9 +22,17 @@
 
 import bpy
 import os
-from .gta_sa_ipl_importer import parse_ipl, import_dff, place_objects, export_ipl, export_ide, check_errors
+from .gta_sa_ipl_importer import parse_ipl_table, place_objects_iter, export_ipl, export_ide, check_errors
+from .modal_job import ModalJob
+from .img import ImgArchive
+from .ipl import append_stream_ipls
+from .ide import parse_ide
+from .game_map import GameMap
+from .log import get_logger
 from .water import WATER_OT_Import, WATER_OT_Export, WATER_OT_SetParameters, WATER_OT_GetParameters, WATER_OT_CheckFile
 
+logger = get_logger("gui")
+
 class Xtreme_Byte_PT_Panel(bpy.types.Panel):
     bl_label = "Xtreme Byte"
     bl_idname = "XTREME_PT_BYTE"
@@ -78,9 +86,37 @@ class Xtreme_Byte_PT_Panel(bpy.types.Panel):
         box.prop(scene, "dff_folder", text="Папка DFF")
         box.prop(scene, "img_path", text="Путь к IMG")
         box.prop(scene, "dir_path", text="Путь к DIR (опционально)")
+        box.prop(scene, "extra_img_paths", text="Доп. IMG (через ;)")
+        box.prop(scene, "ide_paths", text="IDE (через ;)")
+        box.prop(scene, "include_stream_ipl", text="Бинарные stream IPL из IMG")
         box.prop(scene, "import_textures", text="Импорт текстур из TXD")  # Новая галочка
+        box.prop(scene, "texture_mode", text="Текстуры")
+        if scene.texture_mode == 'MEMORY':
+            row = box.row(align=True)
+            row.prop(scene, "pack_textures", text="Упаковать в .blend")
+            row.prop(scene, "save_texture_files", text="Сохранить PNG")
+        box.prop(scene, "persistent_texture_cache", text="Сохранять кэш текстур между импортами")
+        row = box.row(align=True)
+        row.prop(scene, "parallel_decode", text="Параллельное декодирование")
+        row.prop(scene, "decode_workers", text="Процессов")
+        row = box.row(align=True)
+        row.prop(scene, "persistent_model_cache", text="Кэш моделей")
+        row.prop(scene, "model_cache_size", text="МБ")
+        box.prop(scene, "debug_log", text="Подробный лог (отладка)")
+        box.prop(scene, "profile_import", text="Профилировать импорт")
+        if scene.profile_import:
+            row = box.row(align=True)
+            row.prop(scene, "profile_format", text="Отчёт")
+            row.prop(scene, "profile_slowest", text="Моделей")
+            if scene.profile_format == 'JSON':
+                box.prop(scene, "profile_path", text="Файл отчёта")
         box.operator("import.ipl", text="Импортировать IPL")
 
+        col = box.column(align=True)
+        col.prop(scene, "game_dir", text="Папка игры")
+        col.prop(scene, "map_regions", text="Регионы (через ;)")
+        col.operator("import.map_region", text="Импортировать регионы карты")
+
         col = box.column(align=True)
         col.prop(scene, "export_ipl_path", text="Экспорт IPL")
         col.prop(scene, "export_ide_path", text="Экспорт IDE")
@@ -101,27 +137,84 @@ class Xtreme_Byte_PT_Panel(bpy.types.Panel):
 
         box.operator("gta.check_errors", text="Проверить ошибки")
 
-class IMPORT_OT_IPL(bpy.types.Operator):
+class IMPORT_OT_IPL(ModalJob, bpy.types.Operator):
     bl_idname = "import.ipl"
     bl_label = "Import IPL File"
-    def execute(self, context):
+    job_label = "Импорт IPL"
+
+    def start_job(self, context):
         ipl_path = context.scene.ipl_path
         dff_folder = context.scene.dff_folder
         img_path = context.scene.img_path
         dir_path = context.scene.dir_path
+        extra_img_paths = [p.strip() for p in context.scene.extra_img_paths.split(';') if p.strip()]
         
         if not os.path.exists(ipl_path):
             self.report({'ERROR'}, "Проверьте путь к IPL")
-            return {'CANCELLED'}
+            return None
         
         if not img_path and not os.path.exists(dff_folder):
             self.report({'ERROR'}, "Проверьте путь к папке DFF или IMG")
-            return {'CANCELLED'}
+            return None
         
-        objects = parse_ipl(ipl_path)
-        place_objects(objects, dff_folder if not img_path else None, img_path, dir_path)
-        self.report({'INFO'}, f"Импортировано {len(objects)} объектов")
-        return {'FINISHED'}
+        ide_paths = [p.strip() for p in context.scene.ide_paths.split(';') if p.strip()]
+        missing = [p for p in ide_paths if not os.path.exists(p)]
+        if missing:
+            self.report({'ERROR'}, f"IDE не найден: {missing[0]}")
+            return None
+        ide = parse_ide(ide_paths) if ide_paths else None
+
+        objects = parse_ipl_table(ipl_path)
+        # Бинарные <имя>_streamN.ipl из IMG дополняют текстовый IPL; их LOD ссылаются на его строки
+        if context.scene.include_stream_ipl and img_path and os.path.exists(img_path):
+            base_name = os.path.splitext(os.path.basename(ipl_path))[0]
+            model_names = objects.id_names()
+            if ide is not None:
+                model_names.update(ide.model_names())
+            with ImgArchive(img_path, dir_path) as archive:
+                append_stream_ipls(objects, archive, base_name, model_names)
+        iterator = place_objects_iter(objects, dff_folder if not img_path else None, img_path, dir_path, extra_img_paths, ide)
+        return iterator, len(objects)
+
+    def finish_job(self, context, done, cancelled):
+        if cancelled:
+            self.report({'WARNING'}, f"Импорт прерван: обработано {done} объектов, импортированные остаются в сцене")
+        else:
+            self.report({'INFO'}, f"Импортировано {done} объектов")
+
+class IMPORT_OT_MapRegion(ModalJob, bpy.types.Operator):
+    bl_idname = "import.map_region"
+    bl_label = "Import Map Region"
+    job_label = "Импорт карты"
+
+    def start_job(self, context):
+        game_dir = bpy.path.abspath(context.scene.game_dir)
+        regions = [r.strip() for r in context.scene.map_regions.split(';') if r.strip()] or None
+
+        if not os.path.isdir(game_dir):
+            self.report({'ERROR'}, "Проверьте путь к папке игры")
+            return None
+
+        # Разбираются только IPL регионов и нужные им IDE; архивы для импорта открывает place_objects_iter
+        with GameMap(game_dir) as game_map:
+            if not game_map.regions():
+                self.report({'ERROR'}, "В gta.dat/default.dat не найдено ни одного IPL")
+                return None
+            img_paths = game_map.img_paths
+            if not img_paths:
+                self.report({'ERROR'}, "Не найден ни один IMG-архив игры")
+                return None
+            objects = game_map.load_region(regions)
+            ide = game_map.ide
+
+        iterator = place_objects_iter(objects, None, img_paths[0], None, img_paths[1:], ide)
+        return iterator, len(objects)
+
+    def finish_job(self, context, done, cancelled):
+        if cancelled:
+            self.report({'WARNING'}, f"Импорт прерван: обработано {done} объектов, импортированные остаются в сцене")
+        else:
+            self.report({'INFO'}, f"Импортировано {done} объектов")
 
 class GTA_OT_SetValues(bpy.types.Operator):
     bl_idname = "gta.set_values"
@@ -212,14 +305,14 @@ class GTA_OT_CheckErrors(bpy.types.Operator):
         objects = bpy.context.selected_objects
         errors, warnings = check_errors(objects)
         for error in errors:
-            print(error)
+            logger.error(error)
         for warning in warnings:
-            print(warning)
+            logger.warning(warning)
         self.report({'INFO' if not errors else 'WARNING'}, f"Найдено ошибок: {len(errors)}, предупреждений: {len(warnings)}")
         return {'FINISHED'}
 
 classes = [
-    Xtreme_Byte_PT_Panel, IMPORT_OT_IPL, EXPORT_OT_IPL, EXPORT_OT_IDE,
+    Xtreme_Byte_PT_Panel, IMPORT_OT_IPL, IMPORT_OT_MapRegion, EXPORT_OT_IPL, EXPORT_OT_IDE,
     GTA_OT_SetValues, GTA_OT_GetAll, GTA_OT_ResetAll, GTA_OT_CheckErrors,
     WATER_OT_Import, WATER_OT_Export, WATER_OT_SetParameters, WATER_OT_GetParameters,
     WATER_OT_CheckFile
@@ -241,6 +334,11 @@ def register():
     bpy.types.Scene.lod_autosearch = bpy.props.BoolProperty(name="LOD AutoSearch", default=False)
     bpy.types.Scene.img_path = bpy.props.StringProperty(name="IMG Path", subtype='FILE_PATH')
     bpy.types.Scene.dir_path = bpy.props.StringProperty(name="DIR Path (optional)", subtype='FILE_PATH')
+    bpy.types.Scene.extra_img_paths = bpy.props.StringProperty(
+        name="Extra IMG Paths",
+        description="Дополнительные IMG-архивы через ';'. Более поздние перекрывают основной архив и предыдущие",
+        default=""
+    )
     bpy.types.Scene.water_path = bpy.props.StringProperty(name="Water Path", subtype='FILE_PATH')
     bpy.types.Scene.water_path_export = bpy.props.StringProperty(name="Export Water Path", subtype='FILE_PATH')
     bpy.types.Scene.water_speed_x = bpy.props.FloatProperty(name="Water Speed X", default=0.0)
@@ -263,6 +361,104 @@ def register():
         description="Если включено, текстуры будут извлечены из TXD и применены к моделям",
         default=False
     )
+    bpy.types.Scene.game_dir = bpy.props.StringProperty(
+        name="Папка игры",
+        description="Папка GTA San Andreas с data/gta.dat и data/default.dat",
+        subtype='DIR_PATH',
+        default=""
+    )
+    bpy.types.Scene.map_regions = bpy.props.StringProperty(
+        name="Регионы карты",
+        description="Имена IPL из gta.dat через ';' (например, LAe;LAe2). Пусто — вся карта",
+        default=""
+    )
+    bpy.types.Scene.ide_paths = bpy.props.StringProperty(
+        name="IDE",
+        description="IDE-файлы через точку с запятой: из них берутся TXD моделей (с учётом txdp) и имена моделей бинарных IPL",
+        default=""
+    )
+    bpy.types.Scene.include_stream_ipl = bpy.props.BoolProperty(
+        name="Бинарные stream IPL",
+        description="Добавить размещения из бинарных <имя IPL>_streamN.ipl в IMG-архиве. Модели определяются по id из IDE и текстового IPL",
+        default=False
+    )
+    bpy.types.Scene.texture_mode = bpy.props.EnumProperty(
+        name="Texture Mode",
+        items=[
+            ('PNG', "PNG на диск", "Декодировать текстуры в PNG-файлы и загружать их в Blender"),
+            ('MEMORY', "Напрямую в Blender", "Передавать пиксели текстур в изображения Blender без записи на диск"),
+            ('DDS', "DDS без декодирования", "Сжатые DXT1/3/5 текстуры записывать в .dds как есть, остальные — в PNG")
+        ],
+        default='PNG'
+    )
+    bpy.types.Scene.pack_textures = bpy.props.BoolProperty(
+        name="Упаковать текстуры",
+        description="Упаковать созданные в памяти изображения в .blend",
+        default=False
+    )
+    bpy.types.Scene.save_texture_files = bpy.props.BoolProperty(
+        name="Сохранить PNG",
+        description="Дополнительно записать созданные в памяти изображения в папку textures",
+        default=False
+    )
+    bpy.types.Scene.persistent_texture_cache = bpy.props.BoolProperty(
+        name="Постоянный кэш текстур",
+        description="Если включено, извлечённые из TXD текстуры переиспользуются следующими импортами, пока TXD не изменился",
+        default=False
+    )
+
+    bpy.types.Scene.parallel_decode = bpy.props.BoolProperty(
+        name="Параллельное декодирование",
+        description="Декодировать DFF и TXD в отдельных процессах, в Blender создавать только объекты",
+        default=False
+    )
+    bpy.types.Scene.decode_workers = bpy.props.IntProperty(
+        name="Процессов декодирования",
+        description="Число процессов декодирования, 0 — по числу ядер",
+        default=0,
+        min=0
+    )
+    bpy.types.Scene.persistent_model_cache = bpy.props.BoolProperty(
+        name="Постоянный кэш моделей",
+        description="Сохранять декодированную геометрию DFF на диск и переиспользовать её, пока DFF не изменился",
+        default=False
+    )
+    bpy.types.Scene.model_cache_size = bpy.props.IntProperty(
+        name="Размер кэша моделей, МБ",
+        description="Давно не использованные модели удаляются из кэша сверх этого размера, 0 — без ограничения",
+        default=1024,
+        min=0
+    )
+    bpy.types.Scene.debug_log = bpy.props.BoolProperty(
+        name="Подробный лог",
+        description="Выводить в консоль сообщения по каждой строке, модели, материалу и текстуре. Замедляет импорт",
+        default=False
+    )
+    bpy.types.Scene.profile_import = bpy.props.BoolProperty(
+        name="Профилировать импорт",
+        description="Замерять время и число вызовов по фазам импорта и выводить отчёт в конце",
+        default=False
+    )
+    bpy.types.Scene.profile_format = bpy.props.EnumProperty(
+        name="Формат отчёта",
+        items=[
+            ('TEXT', "Текст", "Вывести таблицу фаз и самых медленных моделей в консоль"),
+            ('JSON', "JSON", "Записать отчёт в JSON-файл, без файла — вывести в консоль")
+        ],
+        default='TEXT'
+    )
+    bpy.types.Scene.profile_path = bpy.props.StringProperty(
+        name="Файл отчёта",
+        description="Путь к JSON-файлу отчёта профилировщика",
+        subtype='FILE_PATH',
+        default=""
+    )
+    bpy.types.Scene.profile_slowest = bpy.props.IntProperty(
+        name="Медленных моделей",
+        description="Сколько самых медленных моделей показать в отчёте",
+        default=10,
+        min=0
+    )
 
 def unregister():
     for cls in classes:
@@ -280,6 +476,7 @@ def unregister():
     del bpy.types.Scene.lod_autosearch
     del bpy.types.Scene.img_path
     del bpy.types.Scene.dir_path
+    del bpy.types.Scene.extra_img_paths
     del bpy.types.Scene.water_path
     del bpy.types.Scene.water_path_export
     del bpy.types.Scene.water_speed_x
@@ -288,3 +485,20 @@ def unregister():
     del bpy.types.Scene.unk_height
     del bpy.types.Scene.water_type
     del bpy.types.Scene.import_textures  # Удаляем новое свойство
+    del bpy.types.Scene.game_dir
+    del bpy.types.Scene.map_regions
+    del bpy.types.Scene.ide_paths
+    del bpy.types.Scene.include_stream_ipl
+    del bpy.types.Scene.texture_mode
+    del bpy.types.Scene.pack_textures
+    del bpy.types.Scene.save_texture_files
+    del bpy.types.Scene.persistent_texture_cache
+    del bpy.types.Scene.parallel_decode
+    del bpy.types.Scene.decode_workers
+    del bpy.types.Scene.persistent_model_cache
+    del bpy.types.Scene.model_cache_size
+    del bpy.types.Scene.debug_log
+    del bpy.types.Scene.profile_import
+    del bpy.types.Scene.profile_format
+    del bpy.types.Scene.profile_path
+    del bpy.types.Scene.profile_slowest
@@ -0,0 +1,161 @@
+# MIT License
+#
+# Copyright (c) 2025 xtreme byte
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Разбор IDE без bpy: определения объектов (objs, tobj, anim) и родители TXD (txdp)
+
+from collections import namedtuple
+
+from .log import get_logger, count
+
+logger = get_logger("ide")
+
+# time_on/time_off заданы только у tobj, anim_name — только у anim
+IdeObject = namedtuple("IdeObject", "id model_name txd_name draw_distance flags section time_on time_off anim_name")
+
+IDE_SECTIONS = ('objs', 'tobj', 'anim', 'txdp')
+
+def _parse_objs(fields, section):
+    # Варианты строки objs: id, модель, TXD, [число мешей,] 1–3 дистанции прорисовки, флаги
+    time_on = time_off = None
+    if section == 'tobj':
+        time_on, time_off = int(fields[-2]), int(fields[-1])
+        fields = fields[:-2]
+    if len(fields) < 5:
+        raise IndexError(f"недостаточно данных ({len(fields)} частей)")
+    distance_index = 3 if len(fields) == 5 else 4
+    return IdeObject(
+        int(fields[0]), fields[1].strip(), fields[2].strip(),
+        float(fields[distance_index]), int(fields[-1]), section, time_on, time_off, None
+    )
+
+def _parse_anim(fields, section):
+    if len(fields) < 6:
+        raise IndexError(f"недостаточно данных ({len(fields)} частей)")
+    return IdeObject(
+        int(fields[0]), fields[1].strip(), fields[2].strip(),
+        float(fields[4]), int(fields[5]), section, None, None, fields[3].strip()
+    )
+
+_OBJECT_PARSERS = {
+    'objs': _parse_objs,
+    'tobj': _parse_objs,
+    'anim': _parse_anim,
+}
+
+class IdeIndex:
+    """Определения объектов из одного или нескольких IDE.
+
+    by_id и by_name — хэш-индексы id -> IdeObject и имя модели (без учёта регистра) -> IdeObject;
+    txd_parents — имя TXD -> имя родительского TXD из секций txdp. Более поздние определения
+    перекрывают ранние, как при загрузке IDE игрой.
+    """
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_name = {}
+        self.txd_parents = {}
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def add(self, record):
+        self.by_id[record.id] = record
+        self.by_name[record.model_name.lower()] = record
+
+    def get(self, key):
+        """Запись по id (int) или по имени модели."""
+        if isinstance(key, str):
+            return self.by_name.get(key.lower())
+        return self.by_id.get(key)
+
+    def model_names(self):
+        """Таблица id -> имя модели, например для разрешения бинарных IPL."""
+        return {obj_id: record.model_name for obj_id, record in self.by_id.items()}
+
+    def txd_chain(self, txd_name):
+        """TXD и его родители из txdp, начиная с самого TXD; циклы в txdp обрываются."""
+        chain = []
+        seen = set()
+        while txd_name and txd_name.lower() not in seen:
+            seen.add(txd_name.lower())
+            chain.append(txd_name)
+            txd_name = self.txd_parents.get(txd_name.lower())
+        return chain
+
+    def load(self, ide_path):
+        """Разбирает IDE за один проход и добавляет его определения в индекс; возвращает число объектов."""
+        objects = skipped = 0
+        section = None
+        parse_object = None
+        with open(ide_path, 'r') as file:
+            for line_number, line in enumerate(file, 1):
+                comment = line.find('#')
+                if comment >= 0:
+                    line = line[:comment]
+                fields = line.split(',')
+
+                if len(fields) == 1:
+                    keyword = line.strip().lower()
+                    # end вне секции (например, лишний перед первой) ничего не открывает
+                    if not keyword or (section is None and keyword == 'end'):
+                        continue
+                    if section is None:
+                        section = keyword
+                        parse_object = _OBJECT_PARSERS.get(keyword)
+                        if keyword not in IDE_SECTIONS:
+                            logger.debug(f"Секция IDE '{keyword}' на строке {line_number} пропущена")
+                        continue
+                    if keyword == 'end':
+                        section = None
+                        continue
+                if section not in IDE_SECTIONS:
+                    continue
+
+                try:
+                    if section == 'txdp':
+                        if len(fields) < 2:
+                            raise IndexError(f"недостаточно данных ({len(fields)} частей)")
+                        self.txd_parents[fields[0].strip().lower()] = fields[1].strip()
+                        continue
+                    self.add(parse_object(fields, section))
+                    objects += 1
+                except IndexError as e:
+                    skipped += 1
+                    logger.debug(f"Строка {line_number} IDE пропущена: {e}: {line.strip()}")
+                except ValueError as e:
+                    skipped += 1
+                    logger.warning(f"Ошибка в строке {line_number} IDE {ide_path}: {line.strip()} — {e}. Строка пропущена.")
+
+        count('ide_objects', objects)
+        count('ide_skipped', skipped)
+        logger.info(f"IDE {ide_path}: {objects} объектов")
+        return objects
+
+def parse_ide(ide_paths, index=None):
+    """Разбирает один или несколько IDE в IdeIndex (новый или переданный)."""
+    if index is None:
+        index = IdeIndex()
+    if isinstance(ide_paths, str):
+        ide_paths = [ide_paths]
+    for ide_path in ide_paths:
+        index.load(ide_path)
+    return index
@@ -0,0 +1,344 @@
+# MIT License
+#
+# Copyright (c) 2025 xtreme byte
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import mmap
+import hashlib
+import tempfile
+from array import array
+from collections.abc import Mapping
+from struct import unpack, unpack_from, pack, calcsize
+
+from .log import get_logger
+
+logger = get_logger("img")
+
+IMG_SECTOR_SIZE = 2048
+
+# Бинарный индекс каталога IMG, который кэшируется рядом во временной папке
+IMG_INDEX_MAGIC = b'XBIX'
+IMG_INDEX_VERSION = 1
+IMG_INDEX_HEADER = "<4sIQqQqII"
+IMG_INDEX_DIR = os.path.join(tempfile.gettempdir(), "gta_img_index")
+
+# Пакетное чтение: записи ближе этого зазора читаются одним запросом, но не больше max_read за раз
+IMG_BATCH_MAX_GAP = 64 * 1024
+IMG_BATCH_MAX_READ = 16 * 1024 * 1024
+
+def parse_img(img_path, dir_path=None):
+    files = {}
+    if dir_path:
+        if not os.path.exists(dir_path):
+            logger.error(f"Файл .dir не найден: {dir_path}")
+            return files
+        with open(dir_path, 'rb') as dir_file:
+            dir_data = dir_file.read()
+            for i in range(0, len(dir_data), 32):
+                offset, size, name = unpack('<II24s', dir_data[i:i+32])
+                name = name.decode('ascii').rstrip('\0').lower()
+                files[name] = (offset * IMG_SECTOR_SIZE, size * IMG_SECTOR_SIZE)
+    else:
+        with open(img_path, 'rb') as img_file:
+            header = img_file.read(8)
+            if header[:4] != b'VER2':
+                logger.error(f"Неподдерживаемая версия IMG или файл поврежден: {img_path}")
+                return files
+            num_entries = unpack('<I', header[4:8])[0]
+            for _ in range(num_entries):
+                offset, size, name = unpack('<II24s', img_file.read(32))
+                name = name.decode('ascii').rstrip('\0').lower()
+                files[name] = (offset * IMG_SECTOR_SIZE, size * IMG_SECTOR_SIZE)
+    return files
+
+class ImgIndex(Mapping):
+    """Каталог IMG: отсортированные по имени массивы смещений/размеров и хэш-поиск имя -> индекс."""
+
+    def __init__(self, names, offsets, sizes):
+        # names отсортированы, offsets/sizes хранятся в секторах
+        self.names = names
+        self.offsets = offsets
+        self.sizes = sizes
+        self._lookup = {name: i for i, name in enumerate(names)}
+
+    @staticmethod
+    def from_files(files):
+        names = sorted(files)
+        offsets = array('I', (files[name][0] // IMG_SECTOR_SIZE for name in names))
+        sizes = array('I', (files[name][1] // IMG_SECTOR_SIZE for name in names))
+        return ImgIndex(names, offsets, sizes)
+
+    def __getitem__(self, name):
+        i = self._lookup[name]
+        return (self.offsets[i] * IMG_SECTOR_SIZE, self.sizes[i] * IMG_SECTOR_SIZE)
+
+    def __contains__(self, name):
+        return name in self._lookup
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+def _img_index_stamp(img_path, dir_path=None):
+    """Ключ актуальности индекса: размер и время изменения архива и .dir."""
+    img_stat = os.stat(img_path)
+    dir_size, dir_mtime = 0, 0
+    if dir_path:
+        dir_stat = os.stat(dir_path)
+        dir_size, dir_mtime = dir_stat.st_size, dir_stat.st_mtime_ns
+    return img_stat.st_size, img_stat.st_mtime_ns, dir_size, dir_mtime
+
+def _img_index_path(img_path, dir_path=None):
+    key = os.path.abspath(img_path) + '|' + (os.path.abspath(dir_path) if dir_path else '')
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(IMG_INDEX_DIR, f"{os.path.basename(img_path)}.{digest}.idx")
+
+def _read_img_index(index_path, stamp):
+    with open(index_path, 'rb') as index_file:
+        data = index_file.read()
+
+    header_size = calcsize(IMG_INDEX_HEADER)
+    magic, version, *file_stamp, count, names_len = unpack_from(IMG_INDEX_HEADER, data)
+    if magic != IMG_INDEX_MAGIC or version != IMG_INDEX_VERSION or tuple(file_stamp) != stamp:
+        return None
+
+    pos = header_size
+    names = data[pos:pos + names_len].decode('ascii').split('\0') if count else []
+    pos += names_len
+    offsets = array('I')
+    offsets.frombytes(data[pos:pos + 4 * count])
+    pos += 4 * count
+    sizes = array('I')
+    sizes.frombytes(data[pos:pos + 4 * count])
+
+    if len(names) != count or len(sizes) != count:
+        return None
+    return ImgIndex(names, offsets, sizes)
+
+def _write_img_index(index_path, stamp, index):
+    if any('\0' in name for name in index.names):
+        raise ValueError("имена записей содержат нулевые байты")
+    names = '\0'.join(index.names).encode('ascii')
+    data = pack(IMG_INDEX_HEADER, IMG_INDEX_MAGIC, IMG_INDEX_VERSION, *stamp, len(index), len(names))
+    data += names + index.offsets.tobytes() + index.sizes.tobytes()
+
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'wb') as index_file:
+        index_file.write(data)
+    os.replace(tmp_path, index_path)
+
+def load_img_index(img_path, dir_path=None):
+    """Загружает каталог IMG из кэша на диске, перестраивая его, если архив или .dir изменились."""
+    try:
+        stamp = _img_index_stamp(img_path, dir_path)
+    except OSError:
+        return ImgIndex.from_files(parse_img(img_path, dir_path))
+
+    index_path = _img_index_path(img_path, dir_path)
+    if os.path.exists(index_path):
+        try:
+            index = _read_img_index(index_path, stamp)
+            if index is not None:
+                logger.info(f"Индекс IMG загружен из кэша: {index_path}")
+                return index
+        except Exception as e:
+            logger.warning(f"Кэш индекса IMG повреждён, будет перестроен: {e}")
+
+    index = ImgIndex.from_files(parse_img(img_path, dir_path))
+    if len(index):
+        try:
+            _write_img_index(index_path, stamp, index)
+            logger.info(f"Индекс IMG сохранён в кэш: {index_path}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось сохранить кэш индекса IMG {index_path}: {e}")
+    return index
+
+class ImgArchive:
+    """IMG-архив, отображённый в память один раз; записи выдаются как memoryview без копирования."""
+
+    def __init__(self, img_path, dir_path=None):
+        self.img_path = img_path
+        self.files = load_img_index(img_path, dir_path)
+        self._file = open(img_path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self._view = memoryview(self._mmap)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __contains__(self, name):
+        return name.lower() in self.files
+
+    def __len__(self):
+        return len(self.files)
+
+    def get(self, name):
+        """Возвращает memoryview на содержимое записи или None, если её нет в архиве."""
+        entry = self.files.get(name.lower())
+        if entry is None:
+            return None
+        offset, size = entry
+        return self._view[offset:offset + size]
+
+    def read_batch(self, names, max_gap=IMG_BATCH_MAX_GAP, max_read=IMG_BATCH_MAX_READ):
+        """Читает набор записей по возрастанию смещения, объединяя близкие секторы в крупные последовательные чтения.
+
+        Возвращает таблицу имя -> memoryview; отсутствующие в архиве имена пропускаются.
+        """
+        entries = []
+        for name in set(name.lower() for name in names):
+            entry = self.files.get(name)
+            if entry is not None:
+                entries.append((entry[0], entry[1], name))
+        entries.sort()
+
+        table = {}
+        reads = 0
+        i = 0
+        while i < len(entries):
+            start = entries[i][0]
+            end = start + entries[i][1]
+            j = i + 1
+            while j < len(entries):
+                offset, size, _ = entries[j]
+                if offset - end > max_gap or max(end, offset + size) - start > max_read:
+                    break
+                end = max(end, offset + size)
+                j += 1
+
+            self._file.seek(start)
+            run = memoryview(self._file.read(end - start))
+            reads += 1
+            for offset, size, name in entries[i:j]:
+                table[name] = run[offset - start:offset - start + size]
+            i = j
+
+        logger.info(f"Пакетно прочитано {len(table)} записей IMG за {reads} чтений")
+        return table
+
+    def close(self):
+        if self._view is None:
+            return
+        self._view.release()
+        self._view = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Кто-то ещё держит срезы записи — mmap закроется сборщиком мусора
+            pass
+        self._file.close()
+
+class ImgOverlayIndex(Mapping):
+    """Объединённый каталог нескольких архивов: имя -> (смещение, размер) в архиве-владельце."""
+
+    def __init__(self, owners):
+        self._owners = owners
+
+    def __getitem__(self, name):
+        return self._owners[name].files[name]
+
+    def __contains__(self, name):
+        return name in self._owners
+
+    def __iter__(self):
+        return iter(self._owners)
+
+    def __len__(self):
+        return len(self._owners)
+
+class ImgOverlay:
+    """Несколько IMG-архивов под одним индексом имён.
+
+    Архивы передаются по возрастанию приоритета: запись из более позднего архива
+    (например, мода) перекрывает одноимённую запись из более раннего (gta3.img, gta_int.img).
+    """
+
+    def __init__(self, archives):
+        self.archives = list(archives)
+        self._owners = {}
+        for archive in self.archives:
+            self._owners.update(dict.fromkeys(archive.files, archive))
+        self.files = ImgOverlayIndex(self._owners)
+
+    @staticmethod
+    def open(paths):
+        """Открывает архивы по списку пар (img_path, dir_path) в порядке возрастания приоритета."""
+        archives = []
+        try:
+            for img_path, dir_path in paths:
+                if not os.path.exists(img_path):
+                    logger.warning(f"IMG-архив не найден и будет пропущен: {img_path}")
+                    continue
+                archives.append(ImgArchive(img_path, dir_path))
+        except Exception:
+            for archive in archives:
+                archive.close()
+            raise
+        return ImgOverlay(archives)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __contains__(self, name):
+        return name.lower() in self._owners
+
+    def __len__(self):
+        return len(self._owners)
+
+    def owner(self, name):
+        """Архив, из которого будет прочитана запись, или None."""
+        return self._owners.get(name.lower())
+
+    def get(self, name):
+        archive = self._owners.get(name.lower())
+        if archive is None:
+            return None
+        return archive.get(name)
+
+    def read_batch(self, names, max_gap=IMG_BATCH_MAX_GAP, max_read=IMG_BATCH_MAX_READ):
+        """Пакетное чтение: имена раскладываются по архивам-владельцам, каждый читается по смещениям."""
+        by_archive = {}
+        for name in set(name.lower() for name in names):
+            archive = self._owners.get(name)
+            if archive is not None:
+                by_archive.setdefault(archive, []).append(name)
+
+        table = {}
+        for archive, archive_names in by_archive.items():
+            table.update(archive.read_batch(archive_names, max_gap, max_read))
+        return table
+
+    def close(self):
+        for archive in self.archives:
+            archive.close()
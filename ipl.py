@@ -0,0 +1,464 @@
+# MIT License
+#
+# Copyright (c) 2025 xtreme byte
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Разбор IPL без bpy: размещения хранятся колонками в структурированном массиве NumPy,
+# имена моделей — один раз в таблице интернированных имён
+
+import re
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from .log import get_logger, count
+
+logger = get_logger("ipl")
+
+# Кватернион хранится в порядке файла: x, y, z, w; lod = -1, если LOD не задан.
+# pos и rot в двойной точности, чтобы значения совпадали с float() текста IPL
+PLACEMENT_DTYPE = np.dtype([
+    ('id', '<i4'),
+    ('model', '<i4'),
+    ('interior', '<i4'),
+    ('pos', '<f8', (3,)),
+    ('rot', '<f8', (4,)),
+    ('lod', '<i4'),
+])
+
+IPL_CHUNK_SIZE = 4096
+
+# Бинарный IPL (*_streamN.ipl в gta3.img): заголовок из счётчиков и пар (смещение, размер) секций,
+# записи секций фиксированного размера идут подряд и отображаются в массивы без разбора
+BNRY_MAGIC = b'bnry'
+BNRY_HEADER = struct.Struct('<4s6i12i')
+BNRY_INST_DTYPE = np.dtype([
+    ('pos', '<f4', (3,)),
+    ('rot', '<f4', (4,)),
+    ('id', '<i4'),
+    ('interior', '<i4'),
+    ('lod', '<i4'),
+])
+# Порядок полей совпадает с текстовой секцией cars
+CAR_DTYPE = np.dtype([
+    ('pos', '<f4', (3,)),
+    ('angle', '<f4'),
+    ('id', '<i4'),
+    ('primary_color', '<i4'),
+    ('secondary_color', '<i4'),
+    ('force_spawn', '<i4'),
+    ('alarm', '<i4'),
+    ('door_lock', '<i4'),
+    ('unknown1', '<i4'),
+    ('unknown2', '<i4'),
+])
+
+BinaryIpl = namedtuple("BinaryIpl", "inst cars")
+
+STREAM_IPL_PATTERN = re.compile(r'^(.+)_stream(\d+)\.ipl$')
+
+class ModelNames:
+    """Таблица интернированных имён моделей: имя (без учёта регистра) -> индекс в порядке первого появления."""
+
+    def __init__(self):
+        self.names = []
+        self.index = {}
+
+    def intern(self, name):
+        key = name.lower()
+        model_index = self.index.get(key)
+        if model_index is None:
+            model_index = self.index[key] = len(self.names)
+            self.names.append(name)
+        return model_index
+
+    def find(self, name):
+        return self.index.get(name.lower())
+
+    def __getitem__(self, model_index):
+        return self.names[model_index]
+
+    def __len__(self):
+        return len(self.names)
+
+class PlacementTable:
+    """Колоночный результат разбора IPL: records — массив PLACEMENT_DTYPE, names — ModelNames."""
+
+    def __init__(self, records, names):
+        self.records = records
+        self.names = names
+
+    def __len__(self):
+        return len(self.records)
+
+    def model_name(self, row):
+        return self.names[self.records['model'][row]]
+
+    def groups(self):
+        """Индексы строк по моделям в порядке таблицы имён: имя модели -> массив индексов."""
+        models = self.records['model']
+        order = np.argsort(models, kind='stable')
+        counts = np.bincount(models, minlength=len(self.names))
+        groups = {}
+        for model_index, rows in enumerate(np.split(order, np.cumsum(counts)[:-1])):
+            if len(rows):
+                groups[self.names[model_index]] = rows
+        return groups
+
+    def rows(self, indices=None):
+        """Строки размещений как кортежи чисел Python: (id, индекс модели, interior, pos, rot, lod)."""
+        records = self.records if indices is None else self.records[indices]
+        return zip(*(records[name].tolist() for name in PLACEMENT_DTYPE.names))
+
+    def id_names(self):
+        """Имена моделей по id объекта (первое появление id)."""
+        ids, first_rows = np.unique(self.records['id'], return_index=True)
+        models = self.records['model'][first_rows]
+        return {obj_id: self.names[model_index] for obj_id, model_index in zip(ids.tolist(), models.tolist())}
+
+    def to_dicts(self):
+        """Размещения в прежнем виде: список словарей со строковыми id, interior и lod ('-1' без LOD)."""
+        objects = []
+        for obj_id, model_index, interior, pos, (x, y, z, w), lod in self.rows():
+            objects.append({
+                'id': str(obj_id),
+                'model_name': self.names[model_index],
+                'interior': str(interior),
+                'pos': tuple(pos),
+                'rot': (w, x, y, z),
+                'lod': str(lod)
+            })
+        return objects
+
+    @classmethod
+    def from_dicts(cls, objects):
+        names = ModelNames()
+        rows = []
+        for obj_data in objects:
+            w, x, y, z = obj_data['rot']
+            rows.append((
+                int(obj_data['id']),
+                names.intern(obj_data['model_name']),
+                int(obj_data['interior']),
+                tuple(obj_data['pos']),
+                (x, y, z, w),
+                int(obj_data['lod']) if obj_data['lod'] else -1
+            ))
+        return cls(np.array(rows, dtype=PLACEMENT_DTYPE), names)
+
+# Разбор полей: int() и float() сами отбрасывают пробелы вокруг числа, строки очищаются от пробелов и кавычек
+_CONVERTERS = {
+    'f': float,
+    'i': int,
+    's': lambda field: field.strip().strip('"'),
+}
+_DEFAULTS = {'f': 0.0, 'i': 0, 's': ''}
+_FIELD_TYPES = {'f': '<f4', 'i': '<i4', 's': 'U32'}
+
+class IplSection:
+    """Описание секции текстового IPL: колонки (имя, тип f/i/s, число полей) и минимальное число полей строки.
+
+    Недостающие необязательные поля в конце строки заполняются нулями; parse_row можно заменить
+    собственной функцией для секций с несколькими вариантами строки.
+    """
+
+    def __init__(self, columns, min_fields, dtype=None, parse_row=None):
+        self.columns = columns
+        self.min_fields = min_fields
+        self.dtype = dtype if dtype is not None else np.dtype([
+            (name, _FIELD_TYPES[kind]) if size == 1 else (name, _FIELD_TYPES[kind], (size,))
+            for name, kind, size in columns
+        ])
+        if parse_row is not None:
+            self.parse_row = parse_row
+
+    def parse_row(self, fields):
+        row = []
+        start = 0
+        for name, kind, size in self.columns:
+            convert = _CONVERTERS[kind]
+            values = [convert(field) for field in fields[start:start + size]]
+            if len(values) < size:
+                values += [_DEFAULTS[kind]] * (size - len(values))
+            row.append(values[0] if size == 1 else tuple(values))
+            start += size
+        return tuple(row)
+
+def _parse_auzo_row(fields):
+    # Звуковая зона задаётся параллелепипедом (два угла) или сферой (центр и радиус)
+    name, sound, switch = _CONVERTERS['s'](fields[0]), int(fields[1]), int(fields[2])
+    if len(fields) >= 9:
+        return (name, sound, switch, tuple(float(field) for field in fields[3:6]),
+                tuple(float(field) for field in fields[6:9]), 0.0)
+    center = tuple(float(field) for field in fields[3:6])
+    return (name, sound, switch, center, center, float(fields[6]))
+
+# Секции, кроме inst (у неё отдельный быстрый разбор в PLACEMENT_DTYPE)
+IPL_SECTIONS = {
+    'cull': IplSection([
+        ('center', 'f', 3), ('width_y', 'f', 1), ('unknown1', 'f', 1), ('unknown2', 'f', 1),
+        ('length_x', 'f', 1), ('unknown3', 'f', 1), ('top_z', 'f', 1), ('flags', 'i', 1), ('extra', 'f', 4),
+    ], 10),
+    'grge': IplSection([
+        ('pos', 'f', 3), ('line', 'f', 2), ('cube', 'f', 3), ('flags', 'i', 1), ('type', 'i', 1), ('name', 's', 1),
+    ], 11),
+    'enex': IplSection([
+        ('entrance', 'f', 3), ('entrance_angle', 'f', 1), ('size', 'f', 3), ('exit', 'f', 3), ('exit_angle', 'f', 1),
+        ('interior', 'i', 1), ('flags', 'i', 1), ('name', 's', 1), ('sky', 'i', 1), ('peds', 'i', 1),
+        ('time_on', 'i', 1), ('time_off', 'i', 1),
+    ], 18),
+    'pick': IplSection([('pos', 'f', 3), ('weapon', 'i', 1)], 4),
+    'jump': IplSection([
+        ('start_lower', 'f', 3), ('start_upper', 'f', 3), ('target_lower', 'f', 3), ('target_upper', 'f', 3),
+        ('camera', 'f', 3), ('reward', 'i', 1),
+    ], 16),
+    'tcyc': IplSection([
+        ('corner1', 'f', 3), ('corner2', 'f', 3), ('unknown', 'i', 1), ('weather', 'i', 1),
+        ('brightness', 'f', 1), ('time', 'f', 1), ('draw_distance', 'f', 1),
+    ], 11),
+    'auzo': IplSection([
+        ('name', 's', 1), ('sound', 'i', 1), ('switch', 'i', 1), ('pos1', 'f', 3), ('pos2', 'f', 3), ('radius', 'f', 1),
+    ], 7, parse_row=_parse_auzo_row),
+    'cars': IplSection([
+        ('pos', 'f', 3), ('angle', 'f', 1), ('id', 'i', 1), ('primary_color', 'i', 1), ('secondary_color', 'i', 1),
+        ('force_spawn', 'i', 1), ('alarm', 'i', 1), ('door_lock', 'i', 1), ('unknown1', 'i', 1), ('unknown2', 'i', 1),
+    ], 12, dtype=CAR_DTYPE),
+    'occl': IplSection([
+        ('center', 'f', 3), ('width_x', 'f', 1), ('width_y', 'f', 1), ('height', 'f', 1), ('rot', 'f', 3),
+        ('flags', 'i', 1),
+    ], 7),
+}
+
+class IplSections:
+    """Все секции текстового IPL: placements — PlacementTable секции inst, остальные — массивы по имени секции."""
+
+    def __init__(self, placements, sections):
+        self.placements = placements
+        self.sections = sections
+
+    def __getitem__(self, name):
+        if name == 'inst':
+            return self.placements.records
+        records = self.sections.get(name)
+        if records is None:
+            records = np.empty(0, dtype=IPL_SECTIONS[name].dtype)
+        return records
+
+def iter_ipl_sections(ipl_path, names, chunk_size=IPL_CHUNK_SIZE):
+    """Разбирает текстовый IPL за один проход и выдаёт пары (секция, массив записей до chunk_size строк).
+
+    Записи inst имеют тип PLACEMENT_DTYPE, имена моделей интернируются в names; остальные секции —
+    типы из IPL_SECTIONS. Комментарии отбрасываются от # до конца строки, неизвестные секции пропускаются.
+    """
+    rows = {}
+    lines = skipped = 0
+    section = None
+    section_spec = None
+    section_rows = None
+    with open(ipl_path, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            comment = line.find('#')
+            if comment >= 0:
+                line = line[:comment]
+            fields = line.split(',')
+
+            if len(fields) == 1:
+                keyword = line.strip().lower()
+                # end вне секции (например, лишний перед первой) ничего не открывает
+                if not keyword or (section is None and keyword == 'end'):
+                    continue
+                if section is None:
+                    section = keyword
+                    section_spec = IPL_SECTIONS.get(keyword)
+                    if keyword != 'inst' and section_spec is None:
+                        logger.debug(f"Секция '{keyword}' на строке {line_number} не поддерживается и пропущена")
+                        continue
+                    section_rows = rows.setdefault(keyword, [])
+                    logger.debug(f"Начало секции '{keyword}' на строке {line_number}")
+                    continue
+                if keyword == 'end':
+                    logger.debug(f"Конец секции '{section}' на строке {line_number}")
+                    section = None
+                    continue
+            if section is None or (section != 'inst' and section_spec is None):
+                continue
+
+            lines += 1
+            try:
+                if section == 'inst':
+                    if len(fields) < 10:
+                        raise IndexError(f"недостаточно данных ({len(fields)} частей)")
+                    obj_id = int(fields[0])
+                    interior = int(fields[2])
+                    pos = (float(fields[3]), float(fields[4]), float(fields[5]))
+                    rot = (float(fields[6]), float(fields[7]), float(fields[8]), float(fields[9]))
+                    lod = int(fields[10]) if len(fields) > 10 and fields[10].strip() else -1
+                    section_rows.append((obj_id, names.intern(fields[1].strip()), interior, pos, rot, lod))
+                else:
+                    if len(fields) < section_spec.min_fields:
+                        raise IndexError(f"недостаточно данных ({len(fields)} частей)")
+                    section_rows.append(section_spec.parse_row(fields))
+            except IndexError as e:
+                skipped += 1
+                logger.debug(f"Строка {line_number} секции '{section}' пропущена: {e}: {line.strip()}")
+                continue
+            except ValueError as e:
+                skipped += 1
+                logger.warning(f"Ошибка в строке {line_number}: {line.strip()} — {e}. Строка пропущена.")
+                continue
+
+            if len(section_rows) >= chunk_size:
+                yield section, _section_records(section, section_rows)
+                section_rows.clear()
+
+    count('ipl_lines', lines)
+    count('ipl_skipped', skipped)
+    for name, section_rows in rows.items():
+        if section_rows:
+            yield name, _section_records(name, section_rows)
+
+def _section_records(section, section_rows):
+    if section == 'inst':
+        count('ipl_objects', len(section_rows))
+        return np.array(section_rows, dtype=PLACEMENT_DTYPE)
+    count('ipl_records', len(section_rows))
+    return np.array(section_rows, dtype=IPL_SECTIONS[section].dtype)
+
+def iter_ipl_placements(ipl_path, names, chunk_size=IPL_CHUNK_SIZE):
+    """Потоково выдаёт размещения секций inst массивами PLACEMENT_DTYPE до chunk_size строк."""
+    for section, records in iter_ipl_sections(ipl_path, names, chunk_size):
+        if section == 'inst':
+            yield records
+
+def parse_ipl_sections(ipl_path, chunk_size=IPL_CHUNK_SIZE):
+    """Разбирает все секции текстового IPL в IplSections."""
+    names = ModelNames()
+    chunks = {}
+    for section, records in iter_ipl_sections(ipl_path, names, chunk_size):
+        chunks.setdefault(section, []).append(records)
+    sections = {section: np.concatenate(section_chunks) for section, section_chunks in chunks.items()}
+    placements = PlacementTable(sections.pop('inst', np.empty(0, dtype=PLACEMENT_DTYPE)), names)
+    logger.info(f"Всего распарсено {len(placements)} объектов из IPL")
+    other = ", ".join(f"{section}: {len(records)}" for section, records in sections.items())
+    if other:
+        logger.info(f"Прочие секции IPL: {other}")
+    return IplSections(placements, sections)
+
+def parse_ipl_table(ipl_path, chunk_size=IPL_CHUNK_SIZE):
+    """Разбирает текстовый IPL целиком; возвращает PlacementTable секции inst."""
+    return parse_ipl_sections(ipl_path, chunk_size).placements
+
+def is_binary_ipl(data):
+    return len(data) >= BNRY_HEADER.size and bytes(data[:4]) == BNRY_MAGIC
+
+def _binary_section(data, dtype, offset, num_records, section):
+    end = offset + num_records * dtype.itemsize
+    if num_records < 0 or offset < 0 or end > len(data):
+        raise ValueError(f"секция {section} выходит за пределы файла: {num_records} записей по смещению {offset}")
+    return np.frombuffer(data, dtype, num_records, offset)
+
+def read_binary_ipl(data):
+    """Отображает секции inst и cars бинарного IPL в массивы BNRY_INST_DTYPE и CAR_DTYPE без копирования.
+
+    data — bytes или memoryview (например, запись IMG); массивы ссылаются на data.
+    """
+    if not is_binary_ipl(data):
+        raise ValueError("нет сигнатуры bnry")
+    header = BNRY_HEADER.unpack_from(data)
+    num_inst, num_cars = header[1], header[5]
+    inst_offset, cars_offset = header[7], header[15]
+    return BinaryIpl(
+        _binary_section(data, BNRY_INST_DTYPE, inst_offset, num_inst, 'inst'),
+        _binary_section(data, CAR_DTYPE, cars_offset, num_cars, 'cars')
+    )
+
+def append_binary_placements(table, inst, model_names=None, parent_rows=None):
+    """Добавляет записи inst бинарного IPL в конец table, интернируя имена моделей в её таблицу имён.
+
+    model_names — id -> имя модели (например, из IDE); по умолчанию имена берутся из размещений table.
+    lod бинарного IPL — номер строки inst родительского текстового IPL: parent_rows (по умолчанию
+    текущий размер table) задаёт, сколько первых строк table занимает родитель; ссылки за его
+    пределы заменяются на -1. Возвращает число записей, пропущенных из-за неизвестного id.
+    """
+    if model_names is None:
+        model_names = table.id_names()
+    if parent_rows is None:
+        parent_rows = len(table)
+
+    ids, inverse = np.unique(inst['id'], return_inverse=True)
+    known_models = np.array([
+        table.names.intern(model_names[obj_id]) if obj_id in model_names else -1
+        for obj_id in ids.tolist()
+    ], dtype=np.int32)
+    models = known_models[inverse.reshape(-1)]
+    known = models >= 0
+
+    records = np.empty(int(known.sum()), dtype=PLACEMENT_DTYPE)
+    records['id'] = inst['id'][known]
+    records['model'] = models[known]
+    records['interior'] = inst['interior'][known]
+    records['pos'] = inst['pos'][known]
+    records['rot'] = inst['rot'][known]
+    lod = inst['lod'][known]
+    records['lod'] = np.where((lod >= 0) & (lod < parent_rows), lod, -1)
+
+    table.records = np.concatenate([table.records, records])
+    unresolved = len(inst) - len(records)
+    count('ipl_binary_objects', len(records))
+    if unresolved:
+        count('ipl_binary_unresolved', unresolved)
+        logger.debug(f"Пропущено {unresolved} записей бинарного IPL: id нет среди известных моделей")
+    return unresolved
+
+def stream_ipl_index(files):
+    """Все бинарные IPL каталога IMG за один проход: имя текстового IPL -> записи _streamN.ipl по возрастанию N."""
+    streams = {}
+    for name in files:
+        match = STREAM_IPL_PATTERN.match(name)
+        if match:
+            streams.setdefault(match.group(1), []).append((int(match.group(2)), name))
+    return {base_name: [name for _, name in sorted(entries)] for base_name, entries in streams.items()}
+
+def stream_ipl_names(files, base_name):
+    """Имена записей <base_name>_streamN.ipl из каталога IMG по возрастанию N."""
+    return stream_ipl_index(files).get(base_name.lower(), [])
+
+def append_stream_ipls(table, archive, base_name, model_names=None):
+    """Дописывает в table размещения всех бинарных IPL <base_name>_streamN.ipl из архива.
+
+    table должна содержать разобранный текстовый IPL base_name: на его строки ссылаются lod бинарных записей.
+    """
+    parent_rows = len(table)
+    if model_names is None:
+        model_names = table.id_names()
+    names = stream_ipl_names(archive.files, base_name)
+    for name in names:
+        data = archive.get(name)
+        try:
+            inst = read_binary_ipl(data).inst
+        except ValueError as e:
+            logger.warning(f"Бинарный IPL {name} пропущен: {e}")
+            continue
+        append_binary_placements(table, inst, model_names, parent_rows)
+        logger.debug(f"Бинарный IPL {name}: {len(inst)} объектов")
+    if names:
+        logger.info(f"Прочитано бинарных IPL: {len(names)}, всего объектов: {len(table)}")
+    return names
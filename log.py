@@ -0,0 +1,86 @@
+# MIT License
+#
+# Copyright (c) 2025 xtreme byte
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Общий лог аддона: сообщения по отдельным элементам идут на уровне DEBUG и видны только
+# в режиме отладки, а счётчики собираются и выводятся одной сводкой в конце операции
+
+import sys
+import logging
+from collections import Counter
+
+LOGGER_NAME = "xtreme_map"
+
+# Подписи счётчиков для сводки, в порядке вывода
+COUNTER_LABELS = {
+    'ipl_lines': "строк IPL",
+    'ipl_objects': "объектов IPL",
+    'ipl_skipped': "пропущено строк IPL",
+    'ipl_records': "прочих записей IPL",
+    'ipl_binary_objects': "объектов бинарных IPL",
+    'ipl_binary_unresolved': "бинарных объектов без имени модели",
+    'ide_objects': "определений IDE",
+    'ide_skipped': "пропущено строк IDE",
+    'models_imported': "импортировано моделей",
+    'models_failed': "ошибок моделей",
+    'models_cached': "моделей из кэша",
+    'objects_placed': "размещено объектов",
+    'triangles_filtered': "отброшено треугольников",
+    'materials_created': "создано материалов",
+    'materials_shared': "переиспользовано материалов",
+    'textures_decoded': "декодировано текстур",
+    'txd_cache_hits': "TXD из кэша",
+    'txd_failed': "ошибок TXD",
+    'water_lines': "строк water.dat",
+    'water_surfaces': "водных поверхностей",
+    'water_skipped': "пропущено строк water.dat",
+}
+
+counters = Counter()
+
+logger = logging.getLogger(LOGGER_NAME)
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+def get_logger(name):
+    return logger.getChild(name)
+
+def set_debug(debug):
+    """Включает вывод сообщений по каждому элементу (уровень DEBUG)."""
+    logger.setLevel(logging.DEBUG if debug else logging.INFO)
+
+def count(name, value=1):
+    counters[name] += value
+
+def log_summary(title):
+    """Выводит накопленные счётчики одной строкой и сбрасывает их."""
+    names = [name for name in COUNTER_LABELS if counters[name]]
+    names += sorted(name for name in counters if name not in COUNTER_LABELS and counters[name])
+    if names:
+        summary = ", ".join(f"{COUNTER_LABELS.get(name, name)}: {counters[name]}" for name in names)
+        logger.info(f"{title}: {summary}")
+    else:
+        logger.info(title)
+    counters.clear()
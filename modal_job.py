@@ -0,0 +1,118 @@
+# MIT License
+#
+# Copyright (c) 2025 xtreme byte
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import time
+
+from .log import get_logger, set_debug
+
+logger = get_logger("modal")
+
+class ModalJob:
+    """Примесь для операторов, выполняющих длинную работу порциями по таймеру.
+
+    Оператор реализует start_job(context), который возвращает (итератор, всего шагов) или None,
+    и finish_job(context, done, cancelled). Итератор выдаёт число выполненных шагов; каждая порция
+    работает не дольше slice_seconds, после чего Blender обновляет интерфейс. Esc прерывает работу,
+    уже созданные объекты остаются в сцене: итератор закрывается, и его блоки finally освобождают ресурсы.
+    """
+
+    slice_seconds = 0.05
+    timer_interval = 0.01
+    job_label = "Импорт"
+
+    def start_job(self, context):
+        raise NotImplementedError
+
+    def finish_job(self, context, done, cancelled):
+        pass
+
+    def execute(self, context):
+        # Без окна (скрипты, фоновый режим) работа выполняется целиком
+        set_debug(getattr(context.scene, 'debug_log', False))
+        job = self.start_job(context)
+        if job is None:
+            return {'CANCELLED'}
+        iterator, total = job
+        done = 0
+        for done in iterator:
+            pass
+        self.finish_job(context, done, False)
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        set_debug(getattr(context.scene, 'debug_log', False))
+        job = self.start_job(context)
+        if job is None:
+            return {'CANCELLED'}
+        self._iterator, self._total = job
+        self._done = 0
+
+        wm = context.window_manager
+        wm.progress_begin(0, max(self._total, 1))
+        self._timer = wm.event_timer_add(self.timer_interval, window=context.window)
+        wm.modal_handler_add(self)
+        self._set_status(context)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self._iterator.close()
+            self._end(context)
+            logger.info(f"{self.job_label} прерван пользователем: выполнено {self._done} из {self._total}")
+            self.finish_job(context, self._done, True)
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        deadline = time.perf_counter() + self.slice_seconds
+        try:
+            # Хотя бы один шаг за такт, даже если шаг дольше порции
+            while True:
+                self._done = next(self._iterator)
+                if time.perf_counter() >= deadline:
+                    break
+        except StopIteration:
+            self._end(context)
+            self.finish_job(context, self._done, False)
+            return {'FINISHED'}
+        except Exception:
+            self._iterator.close()
+            self._end(context)
+            raise
+
+        context.window_manager.progress_update(min(self._done, self._total))
+        self._set_status(context)
+        return {'RUNNING_MODAL'}
+
+    def _set_status(self, context):
+        if context.workspace is not None:
+            context.workspace.status_text_set(
+                f"{self.job_label}: {self._done} из {self._total} (Esc — прервать)"
+            )
+
+    def _end(self, context):
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        if context.workspace is not None:
+            context.workspace.status_text_set(None)
@@ -0,0 +1,203 @@
+# MIT License
+#
+# Copyright (c) 2025 xtreme byte
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import json
+import shutil
+import hashlib
+
+import numpy as np
+
+from .decode import ModelPayload, MaterialSpec
+from .log import get_logger, count
+
+logger = get_logger("models")
+
+# Описание модели (версия, материалы, флаги) рядом с её массивами .npy
+MODEL_CACHE_META = "meta.json"
+# Записи прежнего формата (один .npz на модель) удаляются при открытии кэша
+LEGACY_CACHE_EXT = ".npz"
+# Меняется вместе с форматом ModelPayload или правилами фильтрации треугольников
+MODEL_CACHE_VERSION = 2
+
+def dff_content_hash(dff_data):
+    """Хэш содержимого DFF; memoryview хэшируется без копирования."""
+    return hashlib.sha1(dff_data).hexdigest()
+
+def _as_tuple(value):
+    # JSON превращает кортежи в списки, а ключ кэша материалов должен быть хэшируемым
+    if isinstance(value, list):
+        return tuple(_as_tuple(item) for item in value)
+    return value
+
+def _dir_size(path):
+    with os.scandir(path) as it:
+        return sum(entry.stat().st_size for entry in it if entry.is_file())
+
+def _load_array(path, name):
+    # Несжатый .npy отображается в память целиком, данные читаются страницами по мере обращения
+    return np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+
+class ModelCache:
+    """Постоянный кэш декодированных моделей: хэш содержимого DFF -> геометрия после фильтрации.
+
+    Каждая модель хранится отдельной папкой в cache_dir: массивы в несжатых .npy, которые при чтении
+    отображаются в память (mmap_mode='r') без копирования, и meta.json с материалами. Порядок
+    вытеснения — по времени последнего использования (mtime meta.json обновляется при попадании);
+    при превышении max_bytes удаляются самые давно использованные модели. max_bytes=0 снимает ограничение.
+    """
+
+    def __init__(self, cache_dir, max_bytes=0):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Ключ -> размер записи; порядок словаря — от давно использованных к недавним
+        self.files = {}
+        self.total_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        found = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(LEGACY_CACHE_EXT):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+                    continue
+                # Недописанная запись прерванного импорта
+                if entry.name.endswith('.tmp'):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    continue
+                meta_path = os.path.join(entry.path, MODEL_CACHE_META)
+                if not entry.is_dir() or not os.path.exists(meta_path):
+                    continue
+                try:
+                    found.append((os.stat(meta_path).st_mtime, entry.name, _dir_size(entry.path)))
+                except OSError:
+                    continue
+        for _, key, size in sorted(found):
+            self.files[key] = size
+            self.total_bytes += size
+        logger.info(f"Кэш моделей: {len(self.files)} моделей, {self.total_bytes / 2**20:.1f} МБ в {self.cache_dir}")
+
+    def key(self, dff_data):
+        return dff_content_hash(dff_data)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key):
+        """Возвращает ModelPayload из кэша (массивы отображены в память только для чтения) или None при промахе."""
+        if key not in self.files:
+            return None
+        path = self._path(key)
+        meta_path = os.path.join(path, MODEL_CACHE_META)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as meta_file:
+                meta = json.load(meta_file)
+            if meta.get('version') != MODEL_CACHE_VERSION:
+                raise ValueError(f"версия {meta.get('version')}")
+            materials = [
+                MaterialSpec(tex_name, _as_tuple(color), _as_tuple(plugins))
+                for tex_name, color, plugins in meta['materials']
+            ]
+            payload = ModelPayload(
+                _load_array(path, 'vertices'),
+                _load_array(path, 'triangles'),
+                [_load_array(path, f'uv_{i}') for i in range(meta['uv_count'])],
+                materials,
+                bool(meta['has_mat_split']),
+                int(meta['filtered'])
+            )
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Запись кэша моделей {path} повреждена или устарела и будет перестроена: {e}")
+            self._remove(key)
+            return None
+
+        # Попадание переносит модель в конец очереди вытеснения
+        self.files[key] = self.files.pop(key)
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        self.hits += 1
+        count('models_cached')
+        return payload
+
+    def store(self, key, payload):
+        """Записывает модель в кэш и вытесняет давно использованные записи сверх лимита."""
+        self.misses += 1
+        arrays = {
+            'vertices': payload.vertices,
+            'triangles': payload.triangles,
+        }
+        for i, uvs in enumerate(payload.uv_arrays):
+            arrays[f'uv_{i}'] = uvs
+        meta = {
+            'version': MODEL_CACHE_VERSION,
+            'uv_count': len(payload.uv_arrays),
+            'materials': [list(spec) for spec in payload.materials],
+            'has_mat_split': bool(payload.has_mat_split),
+            'filtered': int(payload.filtered),
+        }
+
+        path = self._path(key)
+        tmp_path = path + '.tmp'
+        try:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            os.makedirs(tmp_path)
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_path, name + '.npy'), np.ascontiguousarray(array))
+            # meta.json пишется последним: запись без него при сканировании не считается моделью
+            with open(os.path.join(tmp_path, MODEL_CACHE_META), 'w', encoding='utf-8') as meta_file:
+                json.dump(meta, meta_file)
+            if os.path.exists(path):
+                shutil.rmtree(path)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Не удалось записать модель в кэш {path}: {e}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+
+        self.total_bytes -= self.files.pop(key, 0)
+        self.files[key] = _dir_size(path)
+        self.total_bytes += self.files[key]
+        self._evict()
+
+    def _remove(self, key):
+        self.total_bytes -= self.files.pop(key, 0)
+        shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def _evict(self):
+        if not self.max_bytes:
+            return
+        evicted = 0
+        # Последняя записанная модель остаётся, даже если одна превышает лимит
+        while self.total_bytes > self.max_bytes and len(self.files) > 1:
+            self._remove(next(iter(self.files)))
+            evicted += 1
+        if evicted:
+            logger.debug(f"Из кэша моделей вытеснено {evicted} записей")
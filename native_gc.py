@@ -432,10 +432,10 @@ class NativeGCTexture(TextureNative):
             unk1, unk2, unk3, unk4 = unpack_from(">4I", self.data, self._read(16))
 
         self.name = self._read_raw(32)
-        self.name = self.name.decode("utf-8").replace('\0', '')
+        self.name = bytes(self.name).decode("utf-8").replace('\0', '')
 
         self.mask = self._read_raw(32)
-        self.mask = self.mask.decode("utf-8").replace('\0', '')
+        self.mask = bytes(self.mask).decode("utf-8").replace('\0', '')
 
         if rw_version >= 0x33002:
             (
@@ -19,6 +19,9 @@ from struct import unpack_from, calcsize, pack
 from .dff import Chunk, RGBA, Sections, TexCoords, Triangle, Vector
 from .dff import ExtraVertColorExtension
 from .txd import TextureNative, RasterFormat, PaletteType
+from .log import get_logger
+
+logger = get_logger("native_ps2")
 
 # geometry flags
 rpGEOMETRYTRISTRIP              = 0x00000001
@@ -344,7 +347,7 @@ class NativePS2Geometry:
                 geometry._vertex_bone_weights.append(weights)
 
         else:
-            print("Unknown Native PS2 data:", hex(split_type))
+            logger.warning("Unknown Native PS2 data: %s" % hex(split_type))
 
         padding = indices_count * size & 0xF
         if padding:
@@ -428,11 +431,11 @@ class NativePS2Texture(TextureNative):
 
         str_chunk = self._read_chunk()
         self.name = self._read_raw(str_chunk.size)
-        self.name = self.name.decode("utf-8").replace('\0', '')
+        self.name = bytes(self.name).decode("utf-8").replace('\0', '')
 
         str_chunk = self._read_chunk()
         self.mask = self._read_raw(str_chunk.size)
-        self.mask = self.mask.decode("utf-8").replace('\0', '')
+        self.mask = bytes(self.mask).decode("utf-8").replace('\0', '')
 
         native_chunk = self._read_chunk()
         raster_chunk = self._read_chunk()
@@ -0,0 +1,160 @@
+# MIT License
+#
+# Copyright (c) 2025 xtreme byte
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Встроенный профилировщик импорта: время и число вызовов по фазам и самые медленные модели.
+# Пока профилировщик не запущен, phase() возвращает пустой контекст и почти ничего не стоит.
+
+import json
+import time
+import heapq
+from contextlib import nullcontext
+
+# Подписи фаз для отчёта, в порядке конвейера импорта
+PHASE_LABELS = {
+    'img_lookup': "Поиск в IMG",
+    'entry_read': "Чтение записей IMG",
+    'model_cache': "Кэш моделей",
+    'dff_parse': "Разбор DFF",
+    'txd_decode': "Декодирование TXD",
+    'png_write': "Запись PNG/DDS",
+    'image_upload': "Загрузка изображений в Blender",
+    'pool_wait': "Ожидание процессов декодирования",
+    'material_build': "Создание материалов",
+    'mesh_build': "Построение мешей",
+    'object_link': "Размещение объектов",
+}
+
+_NULL_PHASE = nullcontext()
+_active = None
+
+class _Phase:
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+
+class ImportProfiler:
+    """Накопитель времени по фазам импорта и по моделям."""
+
+    def __init__(self, slowest=10):
+        self.slowest = slowest
+        self.phases = {}
+        self.models = {}
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def add(self, name, seconds, calls=1):
+        total = self.phases.get(name)
+        if total is None:
+            self.phases[name] = [seconds, calls]
+        else:
+            total[0] += seconds
+            total[1] += calls
+
+    def add_model(self, model_name, seconds):
+        self.models[model_name] = self.models.get(model_name, 0.0) + seconds
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def wall_time(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def slowest_models(self):
+        return heapq.nlargest(self.slowest, self.models.items(), key=lambda item: item[1])
+
+    def _ordered_phases(self):
+        names = [name for name in PHASE_LABELS if name in self.phases]
+        names += sorted(name for name in self.phases if name not in PHASE_LABELS)
+        return names
+
+    def to_dict(self):
+        return {
+            'wall_time': self.wall_time,
+            'phases': {
+                name: {'seconds': self.phases[name][0], 'calls': self.phases[name][1]}
+                for name in self._ordered_phases()
+            },
+            'slowest_models': [
+                {'model': model_name, 'seconds': seconds}
+                for model_name, seconds in self.slowest_models()
+            ],
+        }
+
+    def report_text(self):
+        wall_time = self.wall_time
+        lines = [f"Профиль импорта: всего {wall_time:.3f} с"]
+        lines.append(f"{'Фаза':<36}{'Вызовов':>10}{'Всего, с':>12}{'Среднее, мс':>14}{'Доля':>8}")
+        for name in self._ordered_phases():
+            seconds, calls = self.phases[name]
+            share = seconds / wall_time * 100 if wall_time else 0.0
+            lines.append(
+                f"{PHASE_LABELS.get(name, name):<36}{calls:>10}{seconds:>12.3f}"
+                f"{seconds / calls * 1000 if calls else 0.0:>14.3f}{share:>7.1f}%"
+            )
+        models = self.slowest_models()
+        if models:
+            lines.append(f"Самые медленные модели ({len(models)}):")
+            for model_name, seconds in models:
+                lines.append(f"  {model_name:<32}{seconds * 1000:>12.1f} мс")
+        return "\n".join(lines)
+
+    def report_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+def start(slowest=10):
+    """Запускает профилирование; фазы, вызванные до stop(), попадают в возвращаемый профилировщик."""
+    global _active
+    _active = ImportProfiler(slowest)
+    return _active
+
+def stop():
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+def active():
+    return _active
+
+def phase(name):
+    if _active is None:
+        return _NULL_PHASE
+    return _active.phase(name)
+
+def add_model(model_name, seconds):
+    if _active is not None:
+        _active.add_model(model_name, seconds)
@@ -0,0 +1,164 @@
+# MIT License
+#
+# Copyright (c) 2025 xtreme byte
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import json
+import hashlib
+
+from .log import get_logger, count
+
+logger = get_logger("textures")
+
+# Манифест постоянного кэша лежит в папке текстур рядом с извлечёнными файлами
+TEXTURE_CACHE_MANIFEST = ".txd_cache.json"
+TEXTURE_CACHE_VERSION = 2
+
+def txd_content_hash(txd_data):
+    """Хэш содержимого TXD; memoryview хэшируется без копирования."""
+    return hashlib.sha1(txd_data).hexdigest()
+
+class TextureCache:
+    """Кэш извлечённых текстур: (имя TXD, хэш содержимого) -> словарь текстура -> путь или изображение Blender.
+
+    В пределах одного импорта каждый TXD обрабатывается не более одного раза: decode(txd_data, output_dir)
+    не зависит от bpy и может выполняться в процессе DecodePool, finish(result) доводит результат
+    в главном потоке (например, создаёт изображения Blender). При persistent=True таблица путей
+    сохраняется в манифест в output_dir и переиспользуется следующими импортами, пока файлы текстур существуют.
+    """
+
+    def __init__(self, output_dir, decode, finish=None, persistent=False, mode="png"):
+        self.output_dir = output_dir
+        self.decode = decode
+        self.finish = finish
+        self.persistent = persistent
+        self.mode = mode
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        if persistent:
+            self._load_manifest()
+
+    def key(self, txd_name, txd_data):
+        return f"{self.mode}:{txd_name.lower()}:{txd_content_hash(txd_data)}"
+
+    @staticmethod
+    def _alive(texture):
+        if isinstance(texture, str):
+            return os.path.exists(texture)
+        # Изображение Blender могло быть удалено пользователем между импортами
+        try:
+            texture.name
+            return True
+        except ReferenceError:
+            return False
+
+    def lookup(self, txd_name, txd_data):
+        """Возвращает (ключ, словарь текстур) при попадании или (ключ, None) при промахе."""
+        key = self.key(txd_name, txd_data)
+        texture_dict = self.entries.get(key)
+        if texture_dict is not None and all(self._alive(texture) for texture in texture_dict.values()):
+            self.hits += 1
+            count('txd_cache_hits')
+            logger.debug(f"Текстуры {txd_name} взяты из кэша ({len(texture_dict)} шт.)")
+            return key, dict(texture_dict)
+        return key, None
+
+    def store(self, key, result):
+        """Доводит результат decode в главном потоке и запоминает его под ключом."""
+        self.misses += 1
+        texture_dict = self.finish(result) if self.finish is not None else result
+        count('textures_decoded', len(texture_dict))
+        # Пустой результат (ошибка загрузки) запоминается только до конца импорта, чтобы не повторять
+        # декодирование в этом запуске; в манифест он не попадает
+        self.entries[key] = dict(texture_dict)
+        self._dirty = True
+        return texture_dict
+
+    def fail(self, key):
+        """Запоминает неудачное декодирование TXD до конца импорта: модели с этим TXD остаются без его текстур."""
+        self.misses += 1
+        count('txd_failed')
+        self.entries[key] = {}
+
+    def get_or_extract(self, txd_name, txd_data):
+        """Возвращает словарь текстур для TXD, декодируя его только при промахе."""
+        key, texture_dict = self.lookup(txd_name, txd_data)
+        if texture_dict is not None:
+            return texture_dict
+        try:
+            result = self.decode(txd_data, self.output_dir)
+        except Exception as e:
+            logger.error(f"Ошибка декодирования TXD {txd_name}: {e}")
+            self.fail(key)
+            return {}
+        return self.store(key, result)
+
+    def _manifest_path(self):
+        return os.path.join(self.output_dir, TEXTURE_CACHE_MANIFEST)
+
+    def _load_manifest(self):
+        manifest_path = self._manifest_path()
+        if not os.path.exists(manifest_path):
+            return
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest.get('version') != TEXTURE_CACHE_VERSION:
+                return
+            # В манифесте хранятся имена файлов относительно output_dir
+            for key, textures in manifest.get('entries', {}).items():
+                if not textures:
+                    continue
+                self.entries[key] = {
+                    tex_name: os.path.join(self.output_dir, file_name)
+                    for tex_name, file_name in textures.items()
+                }
+            logger.info(f"Кэш текстур загружен: {len(self.entries)} TXD из {manifest_path}")
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Кэш текстур повреждён и будет перестроен: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Сохраняет манифест постоянного кэша, если он изменился."""
+        if not self.persistent or not self._dirty:
+            return
+        entries = {}
+        for key, textures in self.entries.items():
+            # Неудачное или пустое извлечение повторяется следующим импортом
+            if not textures:
+                continue
+            # Изображения, созданные прямо в Blender, живут в .blend и в манифест не попадают
+            if all(isinstance(path, str) and os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.output_dir)
+                   for path in textures.values()):
+                entries[key] = {tex_name: os.path.basename(path) for tex_name, path in textures.items()}
+
+        manifest_path = self._manifest_path()
+        tmp_path = manifest_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as manifest_file:
+                json.dump({'version': TEXTURE_CACHE_VERSION, 'entries': entries}, manifest_file)
+            os.replace(tmp_path, manifest_path)
+            self._dirty = False
+            logger.info(f"Кэш текстур сохранён: {manifest_path}")
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить кэш текстур {manifest_path}: {e}")
@@ -16,12 +16,17 @@
 
 from enum import IntEnum
 from math import ceil
-from struct import unpack_from
+from struct import unpack_from, pack
 from collections import namedtuple
 
+import numpy as np
+
 from .dff import Sections, NativePlatformType
-from .dff import types, Chunk, TexDict, PITexDict, Texture
-from .dff import strlen
+from .dff import types, TexDict, PITexDict, Texture
+from .dff import strlen, ChunkReader
+from .log import get_logger
+
+logger = get_logger("txd")
 
 #######################################################
 class RasterFormat(IntEnum):
@@ -63,6 +68,18 @@ class D3DCompressType(IntEnum):
     DXT4 = 4
     DXT5 = 5
 
+# DDS header flags used for block-compressed passthrough
+DDSD_CAPS        = 0x1
+DDSD_HEIGHT      = 0x2
+DDSD_WIDTH       = 0x4
+DDSD_PIXELFORMAT = 0x1000
+DDSD_MIPMAPCOUNT = 0x20000
+DDSD_LINEARSIZE  = 0x80000
+DDPF_FOURCC      = 0x4
+DDSCAPS_COMPLEX  = 0x8
+DDSCAPS_TEXTURE  = 0x1000
+DDSCAPS_MIPMAP   = 0x400000
+
 #######################################################
 class PaletteType(IntEnum):
     PALETTE_NONE  = 0
@@ -132,8 +149,67 @@ class ImageDecoder:
     def _c3(a, b):
         return (2 * b + a) // 3
 
+    @staticmethod
+    def _decode565_array(bits):
+        bits = bits.astype(np.int32)
+        r = ((bits >> 11) & 0x1f) * 0xff // 0x1f
+        g = ((bits >> 5) & 0x3f) * 0xff // 0x3f
+        b = (bits & 0x1f) * 0xff // 0x1f
+        return np.stack((r, g, b), axis=-1)
+
+    @staticmethod
+    def _bc_color_palettes(color0, color1):
+        # Builds the 4 colour palette of every block at once, shape (blocks, 4, 3)
+        c0 = ImageDecoder._decode565_array(color0)
+        c1 = ImageDecoder._decode565_array(color1)
+        opaque = (color0 > color1)[:, None]
+
+        palettes = np.empty((len(color0), 4, 3), np.int32)
+        palettes[:, 0] = c0
+        palettes[:, 1] = c1
+        palettes[:, 2] = np.where(opaque, (2 * c0 + c1) // 3, (c0 + c1) // 2)
+        palettes[:, 3] = np.where(opaque, (2 * c1 + c0) // 3, 0)
+        return palettes
+
+    @staticmethod
+    def _bc_color_indices(bits):
+        # 2-bit colour indices of every texel, shape (blocks, 16) in row order
+        shifts = np.arange(0, 32, 2, dtype=np.uint32)
+        return ((bits[:, None] >> shifts) & 3).astype(np.intp)
+
+    @staticmethod
+    def _bc_blocks_to_image(texels, width, height):
+        # (blocks, 16, 4) texels -> RGBA rows of the whole image
+        blocks_x = width // 4
+        blocks_y = height // 4
+        image = texels.reshape(blocks_y, blocks_x, 4, 4, 4).transpose(0, 2, 1, 3, 4)
+        return image.astype(np.uint8).tobytes()
+
     @staticmethod
     def bc1(data, width, height, alpha_flag):
+        # Partial blocks (mip levels below 4x4) go through the per-texel path
+        if width % 4 or height % 4:
+            return ImageDecoder._bc1_texels(data, width, height, alpha_flag)
+
+        blocks_count = (width // 4) * (height // 4)
+        blocks = np.frombuffer(
+            data, np.dtype([("color0", "<u2"), ("color1", "<u2"), ("bits", "<u4")]), blocks_count
+        )
+        color0 = blocks["color0"]
+        color1 = blocks["color1"]
+
+        palettes = np.empty((blocks_count, 4, 4), np.int32)
+        palettes[:, :, :3] = ImageDecoder._bc_color_palettes(color0, color1)
+        palettes[:, :, 3] = 0xff
+        palettes[:, 3, 3] = np.where(color0 > color1, 0xff, 0)
+        palettes[:, :, 3] |= alpha_flag
+
+        indices = ImageDecoder._bc_color_indices(blocks["bits"])
+        texels = palettes[np.arange(blocks_count)[:, None], indices]
+        return ImageDecoder._bc_blocks_to_image(texels, width, height)
+
+    @staticmethod
+    def _bc1_texels(data, width, height, alpha_flag):
         pos = 0
         ret = bytearray(4 * width * height)
 
@@ -171,8 +247,51 @@ class ImageDecoder:
 
         return bytes(ret)
 
+    @staticmethod
+    def _bc_texels(palettes, indices, alphas, premultiplied):
+        # Combines colour palettes/indices with per-texel alpha into (blocks, 16, 4)
+        blocks_count = len(palettes)
+        rgb = palettes[np.arange(blocks_count)[:, None], indices]
+
+        if premultiplied:
+            # Un-premultiply DXT2/DXT4, same rounding as round() on floats
+            has_alpha = (alphas > 0)[..., None]
+            unpremultiplied = np.minimum(
+                np.round(rgb * 255 / np.maximum(alphas, 1)[..., None]), 255
+            ).astype(np.int32)
+            rgb = np.where(has_alpha, unpremultiplied, rgb)
+
+        texels = np.empty((blocks_count, 16, 4), np.int32)
+        texels[..., :3] = rgb
+        texels[..., 3] = alphas
+        return texels
+
     @staticmethod
     def bc2(data, width, height, premultiplied):
+        # Partial blocks (mip levels below 4x4) go through the per-texel path
+        if width % 4 or height % 4:
+            return ImageDecoder._bc2_texels(data, width, height, premultiplied)
+
+        blocks_count = (width // 4) * (height // 4)
+        blocks = np.frombuffer(
+            data,
+            np.dtype([("alphas", "<u2", 4), ("color0", "<u2"), ("color1", "<u2"), ("bits", "<u4")]),
+            blocks_count
+        )
+
+        # Explicit 4-bit alpha: one 16-bit row per texel row, 4 bits per texel
+        rows = np.repeat(np.arange(4), 4)
+        shifts = np.tile(np.arange(0, 16, 4), 4)
+        alphas = blocks["alphas"].astype(np.int32)[:, rows]
+        alphas = ((alphas >> shifts) & 0xf) * 0x11
+
+        palettes = ImageDecoder._bc_color_palettes(blocks["color0"], blocks["color1"])
+        indices = ImageDecoder._bc_color_indices(blocks["bits"])
+        texels = ImageDecoder._bc_texels(palettes, indices, alphas, premultiplied)
+        return ImageDecoder._bc_blocks_to_image(texels, width, height)
+
+    @staticmethod
+    def _bc2_texels(data, width, height, premultiplied):
         pos = 0
         ret = bytearray(4 * width * height)
 
@@ -218,6 +337,54 @@ class ImageDecoder:
 
     @staticmethod
     def bc3(data, width, height, premultiplied):
+        # Partial blocks (mip levels below 4x4) go through the per-texel path
+        if width % 4 or height % 4:
+            return ImageDecoder._bc3_texels(data, width, height, premultiplied)
+
+        blocks_count = (width // 4) * (height // 4)
+        blocks = np.frombuffer(
+            data,
+            np.dtype([
+                ("alpha0", "u1"), ("alpha1", "u1"), ("alpha_bits", "<u2", 3),
+                ("color0", "<u2"), ("color1", "<u2"), ("bits", "<u4")
+            ]),
+            blocks_count
+        )
+
+        # Interpolated alpha palettes, 8 entries per block
+        a0 = blocks["alpha0"].astype(np.float64)[:, None]
+        a1 = blocks["alpha1"].astype(np.float64)[:, None]
+        steps7 = np.arange(1, 7, dtype=np.float64)
+        steps5 = np.arange(1, 5, dtype=np.float64)
+
+        alpha_palettes = np.empty((blocks_count, 8), np.int32)
+        alpha_palettes[:, 0] = blocks["alpha0"]
+        alpha_palettes[:, 1] = blocks["alpha1"]
+        alpha_palettes[:, 2:] = np.where(
+            a0 > a1,
+            np.round(a0 * ((7 - steps7) / 7) + a1 * (steps7 / 7)),
+            np.concatenate((
+                np.round(a0 * ((5 - steps5) / 5) + a1 * (steps5 / 5)),
+                np.broadcast_to(np.array([0.0, 255.0]), (blocks_count, 2))
+            ), axis=1)
+        )
+
+        # 48-bit alpha index field; the texel at row j, column i uses
+        # the 3 bits at 3 * (12 + i - 4j), as the per-texel decoder does
+        alpha_bits = blocks["alpha_bits"].astype(np.uint64)
+        alpha_bits = alpha_bits[:, 0] | (alpha_bits[:, 1] << 16) | (alpha_bits[:, 2] << 32)
+        texel_j, texel_i = np.divmod(np.arange(16), 4)
+        shifts = (3 * (12 + texel_i - 4 * texel_j)).astype(np.uint64)
+        alpha_indices = ((alpha_bits[:, None] >> shifts) & 7).astype(np.intp)
+        alphas = alpha_palettes[np.arange(blocks_count)[:, None], alpha_indices]
+
+        palettes = ImageDecoder._bc_color_palettes(blocks["color0"], blocks["color1"])
+        indices = ImageDecoder._bc_color_indices(blocks["bits"])
+        texels = ImageDecoder._bc_texels(palettes, indices, alphas, premultiplied)
+        return ImageDecoder._bc_blocks_to_image(texels, width, height)
+
+    @staticmethod
+    def _bc3_texels(data, width, height, premultiplied):
         pos = 0
         ret = bytearray(4 * width * height)
 
@@ -579,6 +746,61 @@ class TextureNative:
 
         return True
 
+    #######################################################
+    def get_dxt_fourcc(self):
+        # Only DXT1/3/5 are passed through, premultiplied DXT2/4 need decoding
+        if self.palette:
+            return None
+
+        if self.platform_id == NativePlatformType.D3D8:
+            return {
+                D3DCompressType.DXT1: b'DXT1',
+                D3DCompressType.DXT3: b'DXT3',
+                D3DCompressType.DXT5: b'DXT5',
+            }.get(self.platform_properties.dxt_type)
+
+        elif self.platform_id == NativePlatformType.D3D9:
+            return {
+                D3DFormat.D3D_DXT1: b'DXT1',
+                D3DFormat.D3D_DXT3: b'DXT3',
+                D3DFormat.D3D_DXT5: b'DXT5',
+            }.get(self.d3d_format)
+
+        return None
+
+    #######################################################
+    def to_dds(self):
+        fourcc = self.get_dxt_fourcc()
+        if fourcc is None or not self.pixels:
+            return None
+
+        # Keep only the levels whose block data is complete
+        block_size = 8 if fourcc == b'DXT1' else 16
+        levels = []
+        for level, pixels in enumerate(self.pixels):
+            blocks = ceil(self.get_width(level) / 4) * ceil(self.get_height(level) / 4)
+            if len(pixels) < blocks * block_size:
+                break
+            levels.append(pixels[:blocks * block_size])
+
+        if not levels:
+            return None
+
+        flags = DDSD_CAPS | DDSD_HEIGHT | DDSD_WIDTH | DDSD_PIXELFORMAT | DDSD_LINEARSIZE
+        caps = DDSCAPS_TEXTURE
+        if len(levels) > 1:
+            flags |= DDSD_MIPMAPCOUNT
+            caps |= DDSCAPS_COMPLEX | DDSCAPS_MIPMAP
+
+        header = pack(
+            "<4s7I44x2I4s5I5I",
+            b'DDS ', 124, flags, self.get_height(0), self.get_width(0),
+            len(levels[0]), 0, len(levels),
+            32, DDPF_FOURCC, fourcc, 0, 0, 0, 0, 0,
+            caps, 0, 0, 0, 0
+        )
+        return b''.join([header] + [bytes(pixels) for pixels in levels])
+
     #######################################################
     def read_pixels(self, data, offset):
         pixels_len = unpack_from("<I", data, offset)[0]
@@ -589,14 +811,15 @@ class TextureNative:
         palette_format = self.get_raster_palette_type()
 
         if palette_format != PaletteType.PALETTE_NONE:
+            # The palette is tiny, copy it so decoders can concatenate slices
             if palette_format == PaletteType.PALETTE_8:
-                return data[offset:offset+1024]
+                return bytes(data[offset:offset+1024])
 
             else:
                 if self.depth == 4:
-                    return data[offset:offset+64]
+                    return bytes(data[offset:offset+64])
 
-                return data[offset:offset+128]
+                return bytes(data[offset:offset+128])
 
         return b''
 
@@ -710,27 +933,7 @@ class Image:
         return self
 
 #######################################################
-class txd:
-
-    #######################################################
-    def _read(self, size):
-        current_pos = self.pos
-        self.pos += size
-
-        return current_pos
-
-    #######################################################
-    def raw(self, size, offset=None):
-
-        if offset is None:
-            offset = self.pos
-
-        return self.data[offset:offset+size]
-
-    #######################################################
-    def read_chunk(self):
-        chunk = Sections.read(Chunk, self.data, self._read(12))
-        return chunk
+class txd(ChunkReader):
 
     #######################################################
     def read_texture_native(self, parent_chunk):
@@ -748,34 +951,36 @@ class txd:
                 if self.device_id == DeviceType.DEVICE_NONE:
                     if platform_id in (NativePlatformType.D3D8, NativePlatformType.D3D9):
                         texture = TextureNative.from_mem(
-                                self.data[self.pos:self.pos+chunk.size]
+                                self.raw(chunk.size)
                         )
                     elif platform_id == NativePlatformType.PS2FOURCC:
                         from .native_ps2 import NativePS2Texture
-                        texture = NativePS2Texture.from_mem(self.data[self.pos:])
+                        texture = NativePS2Texture.from_mem(self.view())
                         self._read(texture.pos - chunk.size)
 
                     elif (platform_id >> 24) == NativePlatformType.GC:
                         from .native_gc import NativeGCTexture
-                        texture = NativeGCTexture.from_mem(self.data[self.pos:], self.rw_version)
+                        texture = NativeGCTexture.from_mem(self.view(), self.rw_version)
                         self._read(texture.pos - chunk.size)
 
                 elif self.device_id in (DeviceType.DEVICE_D3D8, DeviceType.DEVICE_D3D9):
                     texture = TextureNative.from_mem(
-                            self.data[self.pos:self.pos+chunk.size]
+                            self.raw(chunk.size)
                     )
 
                 elif self.device_id == DeviceType.DEVICE_PS2:
                     from .native_ps2 import NativePS2Texture
-                    texture = NativePS2Texture.from_mem(self.data[self.pos:])
+                    texture = NativePS2Texture.from_mem(self.view())
                     self._read(texture.pos - chunk.size)
 
                 elif self.device_id == DeviceType.DEVICE_GC:
                     from .native_gc import NativeGCTexture
-                    texture = NativeGCTexture.from_mem(self.data[self.pos:], self.rw_version)
+                    texture = NativeGCTexture.from_mem(self.view(), self.rw_version)
                     self._read(texture.pos - chunk.size)
 
                 if texture:
+                    logger.debug("Read texture native %s (%dx%d, %d levels)" % (
+                        texture.name, texture.width, texture.height, texture.num_levels))
                     self.native_textures.append(texture)
 
             elif chunk.type == types["Extension"]:
@@ -790,7 +995,7 @@ class txd:
 
         # Read an image
         image = Image.from_mem(
-            self.data[self.pos:self.pos+chunk.size]
+            self.raw(chunk.size)
         )
 
         self._read(chunk.size)
@@ -819,24 +1024,24 @@ class txd:
 
         # Read a texture
         texture = Texture.from_mem(
-            self.data[self.pos:self.pos+chunk.size]
+            self.raw(chunk.size)
         )
 
         self._read(chunk.size)
 
         # Texture Name
         chunk = self.read_chunk()
-        texture.name = self.raw(
+        texture.name = bytes(self.raw(
             strlen(self.data, self.pos)
-        ).decode("utf-8")
+        )).decode("utf-8")
 
         self._read(chunk.size)
 
         # Mask Name
         chunk = self.read_chunk()
-        texture.mask = self.raw(
+        texture.mask = bytes(self.raw(
             strlen(self.data, self.pos)
-        ).decode("utf-8")
+        )).decode("utf-8")
 
         self._read(chunk.size)
 
@@ -899,7 +1104,7 @@ class txd:
 
     #######################################################
     def load_memory(self, data):
-        self.data = data
+        self.set_data(data)
 
         chunk = self.read_chunk()
         self.rw_version = Sections.get_rw_version(chunk.version)
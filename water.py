@@ -26,6 +26,11 @@ import os
 import mathutils
 from enum import Enum
 
+from .modal_job import ModalJob
+from .log import get_logger, count, log_summary
+
+logger = get_logger("water")
+
 class WaterType(Enum):
     DEFAULT_INVISIBLE = 0  
     DEFAULT_VISIBLE = 1    
@@ -49,16 +54,17 @@ def parse_water_dat(water_path):
     try:
         with open(water_path, 'r', encoding='utf-8') as file:
             lines = file.readlines()
-            print(f"Открыт файл {water_path}, найдено {len(lines)} строк")
+            logger.info(f"Открыт файл {water_path}, найдено {len(lines)} строк")
             if len(lines) == 0:
-                print("Файл пустой!")
+                logger.warning("Файл пустой!")
             for i, line in enumerate(lines):
                 line = line.strip()
                 if not line or line.startswith('#') or line == "processed":
-                    print(f"Строка {i+1} пропущена: пустая, комментарий или 'processed': {line}")
+                    logger.debug(f"Строка {i+1} пропущена: пустая, комментарий или 'processed': {line}")
                     continue
+                count('water_lines')
                 parts = [p.strip() for p in line.split()]
-                print(f"Строка {i+1}: найдено {len(parts)} частей: {parts}")
+                logger.debug(f"Строка {i+1}: найдено {len(parts)} частей: {parts}")
                 if len(parts) >= 22:  
                     try:
                         vertices = []
@@ -100,14 +106,17 @@ def parse_water_dat(water_path):
                             flag = WaterType(int(parts[21]))
                         water = Water(vertices=vertices, flag=flag)
                         waters.append(water)
-                        print(f"Строка {i+1}: Успешно распарсена водная поверхность с {len(vertices)} вершинами, flag={flag}")
+                        count('water_surfaces')
+                        logger.debug(f"Строка {i+1}: Успешно распарсена водная поверхность с {len(vertices)} вершинами, flag={flag}")
                     except (ValueError, IndexError) as e:
-                        print(f"Ошибка в строке {i+1}: {line} — {e}. Строка пропущена.")
+                        count('water_skipped')
+                        logger.warning(f"Ошибка в строке {i+1}: {line} — {e}. Строка пропущена.")
                 else:
-                    print(f"Строка {i+1} пропущена: недостаточно данных ({len(parts)} частей): {line}")
+                    count('water_skipped')
+                    logger.debug(f"Строка {i+1} пропущена: недостаточно данных ({len(parts)} частей): {line}")
     except Exception as e:
-        print(f"Ошибка при открытии файла {water_path}: {e}")
-    print(f"Всего распарсено {len(waters)} водных поверхностей из water.dat")
+        logger.error(f"Ошибка при открытии файла {water_path}: {e}")
+    logger.info(f"Всего распарсено {len(waters)} водных поверхностей из water.dat")
     return waters
 
 def create_water_mesh(water, name_prefix="Water"):
@@ -160,33 +169,40 @@ def create_water_mesh(water, name_prefix="Water"):
 
 def import_water(water_path):
     waters = parse_water_dat(water_path)
-    grouped_objects = {flag: [] for flag in WaterType}
-    for water in waters:
-        obj = create_water_mesh(water)
-        grouped_objects[water.flag].append(obj)
-        bpy.context.collection.objects.link(obj)
+    for _ in import_water_iter(waters):
+        pass
+    return waters
 
+def import_water_iter(waters):
+    """Создаёт объекты воды по одному, выдавая число созданных; группы создаются и при прерывании."""
+    grouped_objects = {flag: [] for flag in WaterType}
+    try:
+        for i, water in enumerate(waters):
+            obj = create_water_mesh(water)
+            grouped_objects[water.flag].append(obj)
+            bpy.context.collection.objects.link(obj)
+            yield i + 1
+    finally:
+        for flag, objects in grouped_objects.items():
+            if objects:
 
-    for flag, objects in grouped_objects.items():
-        if objects:
-       
-            parent = bpy.data.objects.new(f"WaterGroup_{flag.name}", None)
-            parent["flag"] = flag.value
-            bpy.context.collection.objects.link(parent)
-            for obj in objects:
-                obj.parent = parent
-    return waters
+                parent = bpy.data.objects.new(f"WaterGroup_{flag.name}", None)
+                parent["flag"] = flag.value
+                bpy.context.collection.objects.link(parent)
+                for obj in objects:
+                    obj.parent = parent
+        log_summary("Импорт воды")
 
 def export_water_dat(water_path, objects):
     with open(water_path, 'w') as file:
         file.write("processed\n")
         for obj in objects:
             if "flag" not in obj:
-                print(f"Пропущен объект {obj.name}: нет свойства 'flag'")
+                logger.warning(f"Пропущен объект {obj.name}: нет свойства 'flag'")
                 continue
             mesh = obj.data
             if len(mesh.vertices) not in {3, 4}:
-                print(f"Пропущен объект {obj.name}: неподходящее количество вершин ({len(mesh.vertices)})")
+                logger.warning(f"Пропущен объект {obj.name}: неподходящее количество вершин ({len(mesh.vertices)})")
                 continue
             flag = WaterType(obj["flag"])
             verts = [v.co for v in mesh.vertices]
@@ -209,19 +225,26 @@ def export_water_dat(water_path, objects):
                 ])
             line_parts.append(str(flag.value))
             file.write(" ".join(line_parts) + "\n")
-    print(f"Экспортировано {len(objects)} водных поверхностей в water.dat: {water_path}")
+    logger.info(f"Экспортировано {len(objects)} водных поверхностей в water.dat: {water_path}")
 
-class WATER_OT_Import(bpy.types.Operator):
+class WATER_OT_Import(ModalJob, bpy.types.Operator):
     bl_idname = "water.import"
     bl_label = "Import Water"
-    def execute(self, context):
+    job_label = "Импорт воды"
+
+    def start_job(self, context):
         water_path = context.scene.water_path
         if not os.path.exists(water_path):
             self.report({'ERROR'}, "Проверьте путь к water.dat")
-            return {'CANCELLED'}
-        waters = import_water(water_path)
-        self.report({'INFO'}, f"Импортировано {len(waters)} водных поверхностей")
-        return {'FINISHED'}
+            return None
+        waters = parse_water_dat(water_path)
+        return import_water_iter(waters), len(waters)
+
+    def finish_job(self, context, done, cancelled):
+        if cancelled:
+            self.report({'WARNING'}, f"Импорт воды прерван: создано {done} водных поверхностей")
+        else:
+            self.report({'INFO'}, f"Импортировано {done} водных поверхностей")
 
 class WATER_OT_Export(bpy.types.Operator):
     bl_idname = "water.export"